@@ -2,6 +2,7 @@
 Class definitions for data structures used by the search algorithms
 """
 import heapq  # for the priority queue implementation
+from collections import deque  # for the queue implementation
 
 
 class Node(object):
@@ -22,6 +23,9 @@ class Node(object):
         current state
     """
 
+    # no per-instance __dict__: a node is allocated for every child pushed
+    __slots__ = ('state', 'parent', 'action', 'cumulative_cost')
+
     def __init__(self, state, parent, action, cumulative_cost=0):
         self.state = state
         self.parent = parent
@@ -33,7 +37,13 @@ class Node(object):
         Returns the sequence of actions from the root to this node
         :return: list of actions
         """
-        return [node.action for node in self._node_path()[1:]]
+        actions = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
 
     def _node_path(self):
         """
@@ -87,7 +97,7 @@ class Queue:
     """
 
     def __init__(self):
-        self.list = []
+        self.deque = deque()
 
     def push(self, item):
         """
@@ -95,21 +105,28 @@ class Queue:
         :param item: (of any type)
         :return: None
         """
-        self.list.insert(0, item)
+        self.deque.append(item)
 
     def pop(self):
         """
         Remove the earliest pushed item from the queue and return it.
         :return: item (of any type)
         """
-        return self.list.pop()
+        return self.deque.popleft()
 
     def is_empty(self):
         """
         Is this queue empty?
         :return: (Boolean) True if the queue is empty, False otherwise
         """
-        return not self.list
+        return not self.deque
+
+    def __len__(self):
+        """
+        How many items are in this queue?
+        :return: (int) the number of items in the queue
+        """
+        return len(self.deque)
 
 
 class PriorityQueue(object):
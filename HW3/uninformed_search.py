@@ -33,8 +33,9 @@ def dfs(problem):
         if node.state not in closed:  # we are implementing graph search
             closed.add(node.state)
             for child_state, action, action_cost in problem.expand(node.state):
-                child_node = data_structures.Node(child_state, node, action)
-                fringe.push(child_node)
+                if child_state not in closed:  # no node for explored states
+                    child_node = data_structures.Node(child_state, node, action)
+                    fringe.push(child_node)
     return None  # Failure -  no solution was found
 
 def bfs(problem):
@@ -45,8 +46,22 @@ def bfs(problem):
     :return: list of actions representing the solution to the quest
             or None if there is no solution
     """
-    # Enter your  code here and remove the pass statement below
-    pass
+    closed = set()  # keep track of our explored states
+    fringe = data_structures.Queue() # for bfs, the fringe is a queue
+    state = problem.start_state()
+    root = data_structures.Node(state, None, None)
+    fringe.push(root)
+    while not fringe.is_empty():
+        node = fringe.pop()
+        if problem.is_goal(node.state):
+            return node.solution()  # we found a solution
+        if node.state not in closed:  # we are implementing graph search
+            closed.add(node.state)
+            for child_state, action, action_cost in problem.expand(node.state):
+                if child_state not in closed:  # no node for explored states
+                    child_node = data_structures.Node(child_state, node, action)
+                    fringe.push(child_node)
+    return None  # Failure -  no solution was found
 
 def ucs(problem):
     """
@@ -0,0 +1,188 @@
+# ----------------------------------------------------------------------
+# Name:     batch
+# Purpose:  Solve many quest files in a pool of worker processes
+# ----------------------------------------------------------------------
+"""
+Solve a batch of quest files and write one JSON line per quest
+
+Usage:  batch.py [source ...] [--manifest manifest ...] [options]
+
+Each source is a quest file or a directory (every *.txt file in it is
+a quest).  A manifest, given with --manifest, is a text file listing
+one quest file per line, relative to the manifest's directory.  Blank
+lines and lines starting with # are ignored in manifests.  A missing
+quest file or directory is reported before any quest is solved.
+
+Each quest is parsed once, by the worker process that solves it, and
+the result (path, cost, nodes expanded, times) is written as a JSON
+line in the order of the sources.  The batch never imports graphics or
+tkinter.
+
+Example:  batch.py quests/ --algorithm astar --heuristic mst_heuristic
+          batch.py --manifest nightly.list --workers 4
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import spartanquest
+
+# Number of quests sent to a worker process at a time
+CHUNK_SIZE = 16
+
+# The search algorithms using a heuristic
+INFORMED = {'astar', 'idastar', 'arastar'}
+
+
+def quest_files(sources, manifests=()):
+    """
+    List the quest files named by the given sources and manifests
+    :param
+    sources (list of strings) quest files or directories of quest files
+    manifests (list of strings) manifests listing quest files
+    :return: list of quest file names
+    :raise ValueError: if a source or a quest file listed in a manifest
+            does not exist
+    """
+    names = []
+    for source in sources:
+        if os.path.isdir(source):
+            names += sorted(os.path.join(source, name)
+                            for name in os.listdir(source)
+                            if name.endswith('.txt'))
+        elif os.path.isfile(source):
+            names.append(source)
+        else:
+            raise ValueError(f'{source}: no such quest file or directory')
+    for manifest_file in manifests:
+        directory = os.path.dirname(manifest_file)
+        with open(manifest_file) as manifest:
+            for number, line in enumerate(manifest, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                name = os.path.join(directory, line)
+                if not os.path.isfile(name):
+                    raise ValueError(f'{manifest_file}, line {number}: '
+                                     f'{line}: no such quest file')
+                names.append(name)
+    return names
+
+
+def solve_file(quest_file, search, heuristic, options):
+    """
+    Parse the quest file and solve it
+    :param
+    quest_file (string) name of the quest file
+    search (string) name of the search algorithm
+    heuristic (string) name of the A* heuristic
+    options (dictionary) see spartanquest.search_options
+    :return: (dictionary) the result, ready to be written as JSON
+    """
+    result = {'quest': quest_file, 'algorithm': search,
+              'heuristic': heuristic if search in INFORMED else None}
+    try:
+        quest, solution, parse_time, search_time = \
+            spartanquest.load_and_solve(quest_file, search, heuristic,
+                                        options)
+    except Exception as error:  # report it and go on with the batch
+        result.update(status='error', error=f'{type(error).__name__}: '
+                                            f'{error}')
+        return result
+    if solution is None:
+        result.update(status='failed', path=None, cost=None)
+    else:
+        result.update(status='solved', path=''.join(solution),
+                      cost=quest.path_cost(solution))
+    result.update(nodes_expanded=quest.nodes_expanded(),
+                  parse_time=round(parse_time, 6),
+                  search_time=round(search_time, 6))
+    return result
+
+
+def solve_batch(names, search, heuristic, options, workers=None,
+                chunk_size=CHUNK_SIZE):
+    """
+    Solve the quest files in a pool of worker processes
+    :param
+    names (list of strings) the quest files
+    search (string) name of the search algorithm
+    heuristic (string) name of the A* heuristic
+    options (dictionary) see spartanquest.search_options
+    workers (int) number of worker processes, None for one per CPU and
+            0 to solve the quests in this process
+    chunk_size (int) number of quests sent to a worker at a time
+    :return: generator of results (see solve_file) in the order of names
+    """
+    if workers is not None and workers < 0:
+        raise ValueError('The number of workers cannot be negative')
+    if chunk_size < 1:
+        raise ValueError('The chunk size must be at least 1')
+    count = len(names)
+    arguments = ([search] * count, [heuristic] * count, [options] * count)
+    if workers == 0:
+        yield from map(solve_file, names, *arguments)
+        return
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(solve_file, names, *arguments,
+                                chunksize=chunk_size)
+
+
+def get_arguments():
+    '''
+    Parse and validate the command line arguments
+    :return: (argparse.Namespace) the parsed arguments
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sources',
+                        help='quest files or directories of quest files',
+                        nargs='*')
+    parser.add_argument('--manifest',
+                        help='text file listing one quest file per line '
+                             '(may be repeated)',
+                        action='append',
+                        default=[])
+    parser.add_argument('--algorithm',
+                        help='search algorithm',
+                        choices=['astar', 'dfs', 'bfs', 'ucs', 'bidir',
+                                 'idastar', 'arastar'],
+                        default='astar')
+    parser.add_argument('--heuristic',
+                        help='A* heuristic',
+                        default='mst_heuristic')
+    parser.add_argument('--workers',
+                        help='number of worker processes (default: one '
+                             'per CPU), 0 to solve in this process',
+                        type=spartanquest.non_negative_integer)
+    parser.add_argument('--chunk-size',
+                        help='number of quests sent to a worker at a time',
+                        type=spartanquest.positive_integer,
+                        default=CHUNK_SIZE)
+    parser.add_argument('--output',
+                        help='output file (default: standard output)',
+                        type=argparse.FileType('w'),
+                        default=sys.stdout)
+    spartanquest.add_search_options(parser)
+    arguments = parser.parse_args()
+    if not arguments.sources and not arguments.manifest:
+        parser.error('give at least one source or manifest')
+    return arguments
+
+
+def main():
+    arguments = get_arguments()
+    options = spartanquest.search_options(arguments)
+    try:
+        names = quest_files(arguments.sources, arguments.manifest)
+    except (OSError, ValueError) as error:
+        sys.exit(f'batch.py: error: {error}')
+    for result in solve_batch(names, arguments.algorithm,
+                              arguments.heuristic, options,
+                              arguments.workers, arguments.chunk_size):
+        arguments.output.write(json.dumps(result) + '\n')
+        arguments.output.flush()
+
+
+if __name__ == '__main__':
+    main()
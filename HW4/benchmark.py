@@ -0,0 +1,272 @@
+# ----------------------------------------------------------------------
+# Name:     benchmark
+# Purpose:  Headless benchmark of the search algorithms on quest files
+# ----------------------------------------------------------------------
+"""
+Run every search algorithm on every quest file without visualization
+
+Usage:  benchmark.py [quest_file ...] [options]
+
+Each quest file (by default every quest*.txt, SJSU.txt and noway.txt
+next to this script) is solved with dfs, bfs, ucs and with astar using
+each heuristic in informed_search.py.  Each combination is repeated and
+the wall time, nodes expanded, path cost and peak memory are reported
+as CSV or JSON.  The peak memory is measured with tracemalloc in one
+extra run so that tracing does not slow down the timed runs, together
+with the memory of the closed set of the search.
+
+With --import-time, the time taken to import spartanquest in a fresh
+interpreter, with and without graphics (and therefore tkinter), is
+reported instead.
+
+Example:  benchmark.py questA.txt questF.txt --repeat 5 --format json
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tracemalloc
+import informed_search
+import spartanquest
+
+ALGORITHMS = ['dfs', 'bfs', 'ucs', 'astar']
+
+FIELDS = ['quest', 'algorithm', 'heuristic', 'status', 'path_length',
+          'path_cost', 'nodes_expanded', 'runs', 'best_time', 'mean_time',
+          'parse_time', 'peak_memory', 'closed_set_memory']
+
+# The imports timed with --import-time: headless solving and solving
+# with visualization
+IMPORTS = ['spartanquest', 'spartanquest, graphics']
+
+IMPORT_FIELDS = ['modules', 'runs', 'best_time', 'mean_time']
+
+
+class TimeLimitExceeded(Exception):
+    """
+    Raised when a search runs longer than the time limit
+    """
+
+
+def quest_files():
+    """
+    List the quest files bundled with the search programs
+    :return: list of file names
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    names = sorted(glob.glob(os.path.join(directory, 'quest*.txt')))
+    names += [os.path.join(directory, name)
+              for name in ('SJSU.txt', 'noway.txt')]
+    return [name for name in names if os.path.exists(name)]
+
+
+def heuristic_names():
+    """
+    List the heuristic functions defined in informed_search.py
+    :return: list of function names
+    """
+    return sorted(name for name in dir(informed_search)
+                  if name.endswith('_heuristic'))
+
+
+def _alarm(signum, frame):
+    """
+    Signal handler interrupting a search at the time limit - private
+    """
+    raise TimeLimitExceeded()
+
+
+def run_once(quest_file, algorithm, heuristic, options, time_limit,
+             measure_closed_set=False):
+    """
+    Parse the quest file and solve it once
+    :param
+    quest_file (string) name of the quest file
+    algorithm (string) name of the search algorithm
+    heuristic (string) name of the A* heuristic
+    options (dictionary) see spartanquest.search_options
+    time_limit (number) seconds allowed for parsing and searching, 0 for
+            no limit
+    measure_closed_set (Boolean) record the memory of the closed set,
+            see Problem.measure_closed_set
+    :return: (tuple) the Problem object, the solution or None, the
+            parse time and the search time
+    """
+    if time_limit:
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        return spartanquest.load_and_solve(quest_file, algorithm, heuristic,
+                                           options, measure_closed_set)
+    finally:
+        if time_limit:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def benchmark(quest_file, algorithm, heuristic, options, repeat=3,
+              time_limit=0, memory=True):
+    """
+    Solve the quest repeatedly with the given algorithm and summarize
+    :param
+    quest_file (string) name of the quest file
+    algorithm (string) name of the search algorithm
+    heuristic (string) name of the A* heuristic
+    options (dictionary) see spartanquest.search_options
+    repeat (int) number of timed runs, at least 1
+    time_limit (number) seconds allowed per run, parsing included, 0
+            for no limit
+    memory (Boolean) measure the peak memory and the closed set memory
+            in one extra traced run
+    :return: (dictionary) one result row, see FIELDS
+    """
+    if repeat < 1:
+        raise ValueError('The benchmark needs at least one timed run')
+    row = dict.fromkeys(FIELDS, '')
+    row.update(quest=os.path.basename(quest_file), algorithm=algorithm,
+               heuristic=heuristic if algorithm == 'astar' else '')
+    times = []
+    try:
+        for run in range(repeat):
+            quest, solution, parse_time, search_time = \
+                run_once(quest_file, algorithm, heuristic, options,
+                         time_limit)
+            times.append(search_time)
+        if memory:
+            tracemalloc.start()
+            try:
+                traced_quest = run_once(quest_file, algorithm, heuristic,
+                                        options, 0, True)[0]
+                row['peak_memory'] = tracemalloc.get_traced_memory()[1]
+                row['closed_set_memory'] = traced_quest.statistics.get(
+                    'Closed set memory (bytes)', '')
+            finally:
+                tracemalloc.stop()
+    except TimeLimitExceeded:
+        row.update(status='timeout', runs=len(times))
+        return row
+    row.update(status='solved' if solution is not None else 'failed',
+               nodes_expanded=quest.nodes_expanded(), runs=len(times),
+               best_time=round(min(times), 6),
+               mean_time=round(statistics.mean(times), 6),
+               parse_time=round(parse_time, 6))
+    if solution is not None:
+        row.update(path_length=len(solution),
+                   path_cost=quest.path_cost(solution))
+    return row
+
+
+def import_time(modules, repeat=3):
+    """
+    Time the import of the given modules in fresh interpreters
+    :param
+    modules (string) comma separated module names, e.g. 'spartanquest'
+    repeat (int) number of timed interpreters
+    :return: (dictionary) one result row, see IMPORT_FIELDS
+    """
+    code = (f'import time\n'
+            f'start_time = time.perf_counter()\n'
+            f'import {modules}\n'
+            f'print(time.perf_counter() - start_time)')
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = [float(subprocess.run([sys.executable, '-c', code],
+                                  cwd=directory, check=True,
+                                  capture_output=True, text=True).stdout)
+             for run in range(repeat)]
+    return {'modules': modules, 'runs': repeat,
+            'best_time': round(min(times), 6),
+            'mean_time': round(statistics.mean(times), 6)}
+
+
+def get_arguments():
+    '''
+    Parse and validate the command line arguments
+    :return: (argparse.Namespace) the parsed arguments
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('quest_files',
+                        help='quest files to solve (default: all bundled)',
+                        nargs='*')
+    parser.add_argument('--algorithms',
+                        help='search algorithms to run',
+                        nargs='+',
+                        choices=ALGORITHMS,
+                        default=ALGORITHMS)
+    parser.add_argument('--heuristics',
+                        help='A* heuristics to run (default: all)',
+                        nargs='+')
+    parser.add_argument('--repeat',
+                        help='number of timed runs per combination',
+                        type=spartanquest.positive_integer,
+                        default=3)
+    parser.add_argument('--time-limit',
+                        help='seconds allowed per run, parsing '
+                             'included, 0 for no limit (Unix only)',
+                        type=float,
+                        default=0)
+    parser.add_argument('--import-time',
+                        help='time the imports of spartanquest with and '
+                             'without graphics instead of the searches',
+                        action='store_true')
+    parser.add_argument('--no-memory',
+                        help='skip the traced run measuring peak memory',
+                        action='store_true')
+    parser.add_argument('--format',
+                        help='output format',
+                        choices=['csv', 'json'],
+                        default='csv')
+    parser.add_argument('--output',
+                        help='output file (default: standard output)',
+                        type=argparse.FileType('w'),
+                        default=sys.stdout)
+    spartanquest.add_search_options(parser)
+    return parser.parse_args()
+
+
+def main():
+    arguments = get_arguments()
+    options = spartanquest.search_options(arguments)
+    if arguments.time_limit:
+        signal.signal(signal.SIGALRM, _alarm)
+    rows = []
+    if arguments.import_time:
+        rows = [import_time(modules, arguments.repeat)
+                for modules in IMPORTS]
+        if arguments.format == 'csv':
+            writer = csv.DictWriter(arguments.output, IMPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, arguments.output, indent=2)
+            arguments.output.write('\n')
+        return
+    if arguments.format == 'csv':
+        writer = csv.DictWriter(arguments.output, FIELDS)
+        writer.writeheader()
+    for quest_file in arguments.quest_files or quest_files():
+        for algorithm in arguments.algorithms:
+            if arguments.macro and algorithm in spartanquest.STEP_SEARCHES:
+                continue  # it counts moves, see spartanquest.solve
+            if algorithm == 'astar':
+                heuristics = arguments.heuristics or heuristic_names()
+            else:
+                heuristics = ['null_heuristic']
+            for heuristic in heuristics:
+                row = benchmark(quest_file, algorithm, heuristic, options,
+                                arguments.repeat, arguments.time_limit,
+                                not arguments.no_memory)
+                if arguments.format == 'csv':
+                    writer.writerow(row)
+                    arguments.output.flush()
+                else:
+                    rows.append(row)
+    if arguments.format == 'json':
+        json.dump(rows, arguments.output, indent=2)
+        arguments.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 """
 Class definitions for data structures used by the search algorithms
 """
+import array  # for the compact closed set implementation
 import heapq  # for the priority queue implementation
+import sys  # for the memory accounting of the closed set
+from collections import deque  # for the queue implementation
+from collections import OrderedDict  # for the LRU cache implementation
 
 
 class Node(object):
@@ -22,6 +26,9 @@ class Node(object):
         current state
     """
 
+    # no per-instance __dict__: a node is allocated for every child pushed
+    __slots__ = ('state', 'parent', 'action', 'cumulative_cost')
+
     def __init__(self, state, parent, action, cumulative_cost=0):
         self.state = state
         self.parent = parent
@@ -31,9 +38,19 @@ class Node(object):
     def solution(self):
         """
         Returns the sequence of actions from the root to this node
+        Macro actions (tuples of actions) are expanded into their steps.
         :return: list of actions
         """
-        return [node.action for node in self._node_path()[1:]]
+        actions = []
+        node = self
+        while node.parent is not None:
+            if isinstance(node.action, tuple):
+                actions.extend(reversed(node.action))
+            else:
+                actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
 
     def _node_path(self):
         """
@@ -80,6 +97,13 @@ class Stack(object):
         """
         return not self.list
 
+    def __len__(self):
+        """
+        How many items are on this stack?
+        :return: (int) the number of items on the stack
+        """
+        return len(self.list)
+
 
 class Queue:
     """
@@ -87,7 +111,7 @@ class Queue:
     """
 
     def __init__(self):
-        self.list = []
+        self.deque = deque()
 
     def push(self, item):
         """
@@ -95,21 +119,28 @@ class Queue:
         :param item: (of any type)
         :return: None
         """
-        self.list.insert(0, item)
+        self.deque.append(item)
 
     def pop(self):
         """
         Remove the earliest pushed item from the queue and return it.
         :return: item (of any type)
         """
-        return self.list.pop()
+        return self.deque.popleft()
 
     def is_empty(self):
         """
         Is this queue empty?
         :return: (Boolean) True if the queue is empty, False otherwise
         """
-        return not self.list
+        return not self.deque
+
+    def __len__(self):
+        """
+        How many items are in this queue?
+        :return: (int) the number of items in the queue
+        """
+        return len(self.deque)
 
 
 class PriorityQueue(object):
@@ -148,3 +179,314 @@ class PriorityQueue(object):
         :return: (Boolean) True if the queue is empty, False otherwise
         """
         return not self.heap
+
+    def __len__(self):
+        """
+        How many items are in this priority queue?
+        :return: (int) the number of items in the queue
+        """
+        return len(self.heap)
+
+
+class IndexedPriorityQueue(object):
+    """
+    Represent a priority queue container where each item is identified
+    by a key and each key is in the queue at most once.
+    Pushing an item whose key is already queued keeps a single entry
+    with the lower of the two priorities (decrease-key).
+    """
+
+    def __init__(self):
+        self.heap = []  # entries are lists [priority, count, key, item]
+        self.index = {}  # maps each key to the position of its entry
+        self.count = 0
+
+    def push_or_decrease(self, item_key, item, priority):
+        """
+        Add the given item with the given priority to the queue, or
+        replace the queued item with the same key if the new priority
+        is lower
+        :param
+        item_key: (hashable) identifies the item, e.g. a problem state
+        item: (of any type)
+        priority: (number or other orderable type)
+        :return: (Boolean) True if the queue changed, False otherwise
+        """
+        position = self.index.get(item_key)
+        if position is None:
+            self.heap.append([priority, self.count, item_key, item])
+            position = len(self.heap) - 1
+            self.index[item_key] = position
+        else:
+            entry = self.heap[position]
+            if priority >= entry[0]:
+                return False
+            entry[0] = priority
+            entry[3] = item
+        self.count += 1
+        self._sift_up(position)
+        return True
+
+    def pop(self):
+        """
+        Remove the item with the lowest priority from the queue and return it.
+        :return: item (of any type)
+        """
+        last = self.heap.pop()
+        if self.heap:
+            priority, count, item_key, item = self.heap[0]
+            self.heap[0] = last
+            self.index[last[2]] = 0
+            self._sift_down(0)
+        else:
+            priority, count, item_key, item = last
+        del self.index[item_key]
+        return item
+
+    def min_priority(self):
+        """
+        Return the lowest priority in the queue without removing its item
+        :return: priority (number or other orderable type)
+        """
+        return self.heap[0][0]
+
+    def items(self):
+        """
+        Return the items in the queue, in no particular order
+        :return: list of items (of any type)
+        """
+        return [entry[3] for entry in self.heap]
+
+    def contains(self, item_key):
+        """
+        Is an item with the given key in this priority queue?
+        :param item_key: (hashable)
+        :return: (Boolean) True if the key is queued, False otherwise
+        """
+        return item_key in self.index
+
+    def is_empty(self):
+        """
+        Is this priority queue empty?
+        :return: (Boolean) True if the queue is empty, False otherwise
+        """
+        return not self.heap
+
+    def __len__(self):
+        """
+        How many items are in this priority queue?
+        :return: (int) the number of items in the queue
+        """
+        return len(self.heap)
+
+    def _sift_up(self, position):
+        """
+        Move the entry at the given position up to restore the heap order
+        This is a private method.
+        :param position: (int) index of the entry in the heap
+        :return: None
+        """
+        heap, index = self.heap, self.index
+        entry = heap[position]
+        while position > 0:
+            parent_position = (position - 1) // 2
+            parent = heap[parent_position]
+            if not entry < parent:
+                break
+            heap[position] = parent
+            index[parent[2]] = position
+            position = parent_position
+        heap[position] = entry
+        index[entry[2]] = position
+
+    def _sift_down(self, position):
+        """
+        Move the entry at the given position down to restore the heap order
+        This is a private method.
+        :param position: (int) index of the entry in the heap
+        :return: None
+        """
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            child_position = 2 * position + 1
+            if child_position >= size:
+                break
+            right_position = child_position + 1
+            if right_position < size and \
+                    heap[right_position] < heap[child_position]:
+                child_position = right_position
+            child = heap[child_position]
+            if not child < entry:
+                break
+            heap[position] = child
+            index[child[2]] = position
+            position = child_position
+        heap[position] = entry
+        index[entry[2]] = position
+
+
+class LRUCache(object):
+    """
+    Represent a bounded mapping that evicts its least recently used
+    entry when it is full.
+    Arguments:
+    capacity (int): the maximum number of entries, 0 disables caching
+    Attributes:
+    capacity (int): the maximum number of entries
+    hits (int): number of lookups that found their key
+    misses (int): number of lookups that did not
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return the value cached for the given key and mark it as the
+        most recently used, or None if the key is not cached
+        :param key: (hashable)
+        :return: the cached value or None
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """
+        Cache the given value for the given key, evicting the least
+        recently used entry if the cache is full
+        :param
+        key: (hashable)
+        value: (of any type other than None)
+        :return: None
+        """
+        if not self.capacity:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        """
+        How many entries are in this cache?
+        :return: (int) the number of cached entries
+        """
+        return len(self.entries)
+
+
+class ClosedSet(object):
+    """
+    Represent the set of explored states of a graph search.
+    The states must be canonical: two equal states must be represented
+    identically (see Problem.expand).
+    Arguments:
+    backing (string): 'set' to keep the states in a Python set,
+        'compact' to keep integer keys in an open addressing hash table
+        of 64 bit integers (8 bytes per slot, no object per state) -
+        defaults to 'set'
+    key (function): compact backing: maps a state to a distinct
+        non-negative integer below 2 ** 63 (see Problem.state_key)
+    Attributes:
+    backing (string): the backing selected
+    """
+    BACKINGS = ('set', 'compact')
+    EMPTY = -1  # marks a free slot of the compact table
+    INITIAL_SLOTS = 1024  # compact table size, a power of 2
+    MULTIPLIER = 0x9E3779B97F4A7C15  # Fibonacci hashing of the keys
+
+    def __init__(self, backing='set', key=None):
+        if backing not in self.BACKINGS:
+            raise ValueError(f'Unknown closed set backing: {backing}')
+        if backing == 'compact' and key is None:
+            raise ValueError('The compact closed set needs a key function')
+        self.backing = backing
+        self.key = key
+        self.states = set()
+        self.slots = None
+        if backing == 'compact':
+            self.slots = array.array('q', [self.EMPTY]) * self.INITIAL_SLOTS
+        self.count = 0
+
+    def add(self, state):
+        """
+        Add a state to this closed set
+        :param state: the state to add
+        :return: None
+        """
+        if self.backing == 'set':
+            self.states.add(state)
+            return
+        key = self.key(state)
+        slot = self._find(key)
+        if self.slots[slot] == self.EMPTY:
+            self.slots[slot] = key
+            self.count += 1
+            if 2 * self.count > len(self.slots):
+                self._grow()
+
+    def __contains__(self, state):
+        """
+        Is the given state in this closed set?
+        :param state: the state to look for
+        :return: (Boolean) True if the state was added, False otherwise
+        """
+        if self.backing == 'set':
+            return state in self.states
+        return self.slots[self._find(self.key(state))] != self.EMPTY
+
+    def __len__(self):
+        """
+        How many states are in this closed set?
+        :return: (int) the number of states
+        """
+        if self.backing == 'set':
+            return len(self.states)
+        return self.count
+
+    def memory(self):
+        """
+        Approximate memory used by this closed set: the table and, with
+        the set backing, the state tuples (not the objects they share
+        with other states)
+        :return: (int) number of bytes
+        """
+        if self.backing == 'set':
+            return sys.getsizeof(self.states) + \
+                sum(sys.getsizeof(state) for state in self.states)
+        return sys.getsizeof(self.slots)
+
+    def _find(self, key):
+        """
+        Return the slot holding the given key, or the free slot where it
+        belongs (linear probing) - private method
+        :param key: (int) the key of a state
+        :return: (int) the index of the slot
+        """
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = (key * self.MULTIPLIER >> 17) & mask
+        while True:
+            found = slots[slot]
+            if found == key or found == self.EMPTY:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        """
+        Double the size of the compact table - private method
+        :return: None
+        """
+        keys = [key for key in self.slots if key != self.EMPTY]
+        self.slots = array.array('q', [self.EMPTY]) * (2 * len(self.slots))
+        for key in keys:
+            self.slots[self._find(key)] = key
@@ -0,0 +1,320 @@
+"""
+Shortest path costs over the maze, respecting walls and the cost of
+each move, used to preprocess a quest for stronger heuristics
+"""
+import array
+import heapq
+import sys
+import data_structures
+
+UNREACHABLE = float('inf')
+
+# Number of single source shortest path trees kept by a PathOracle
+ORACLE_CACHE_SIZE = 64
+
+# Number of landmarks used by the landmark (ALT) lower bounds
+LANDMARK_COUNT = 8
+
+
+def dijkstra(maze, source, reverse=False):
+    """
+    Compute the cheapest cost from the source cell to every cell, or,
+    if reverse is True, from every cell to the source cell
+    :param
+    maze (a Maze object) with its adjacency tables built
+    source (int) flat index of the source cell (see Maze.cell)
+    reverse (Boolean) follow the moves backwards - defaults to False
+    :return: (list) indexed by flat cell index, the cost of the
+            cheapest path or UNREACHABLE
+    """
+    if reverse:
+        adjacency = maze.reverse_table()
+    else:
+        adjacency = maze.adjacency
+    costs = [UNREACHABLE] * len(adjacency)
+    costs[source] = 0
+    fringe = [(0, source)]
+    while fringe:
+        cost, cell = heapq.heappop(fringe)
+        if cost > costs[cell]:
+            continue  # stale entry, the cell was reached more cheaply
+        for neighbor, action, action_cost in adjacency[cell]:
+            new_cost = cost + action_cost
+            if new_cost < costs[neighbor]:
+                costs[neighbor] = new_cost
+                heapq.heappush(fringe, (new_cost, neighbor))
+    return costs
+
+
+class MedalDistances(object):
+    """
+    Cheapest path costs between the medals of a quest and from any
+    cell to each medal, with memoized lower bounds on the cost of
+    collecting a set of medals
+
+    Arguments:
+    problem (a Problem object) representing the quest
+    to_medal (list of lists): the to_medal table if it is known, e.g.
+        loaded from a quest cache - computed if None
+
+    Attributes:
+    to_medal (list of lists): to_medal[i][cell] is the cheapest cost
+        from the given cell to problem.medal_list[i]
+    between (list of lists): between[i][j] is the cheapest cost from
+        medal i to medal j
+    """
+
+    def __init__(self, problem, to_medal=None):
+        maze = problem.maze
+        medal_cells = [maze.cell(medal) for medal in problem.medal_list]
+        # One backward search per medal gives the cost from every cell,
+        # Sammy's start included, to that medal
+        if to_medal is None:
+            to_medal = [dijkstra(maze, cell, reverse=True)
+                        for cell in medal_cells]
+        self.to_medal = to_medal
+        self.between = [[to_medal[cell] for to_medal in self.to_medal]
+                        for cell in medal_cells]
+        self._spanning_costs = {0: 0}
+        self._tour_costs = {}
+
+    def nearest(self, cell, medal_mask):
+        """
+        Cost from the given cell to the closest of the given medals
+        :param
+        cell (int) flat index of Sammy's cell
+        medal_mask (int) bitmask of the remaining medals
+        :return: (number) the cheapest cost or UNREACHABLE
+        """
+        return min(to_medal[cell] for index, to_medal in
+                   enumerate(self.to_medal) if medal_mask >> index & 1)
+
+    def farthest(self, cell, medal_mask):
+        """
+        Cost from the given cell to the most expensive of the given medals
+        :param
+        cell (int) flat index of Sammy's cell
+        medal_mask (int) bitmask of the remaining medals
+        :return: (number) the cost or UNREACHABLE
+        """
+        return max(to_medal[cell] for index, to_medal in
+                   enumerate(self.to_medal) if medal_mask >> index & 1)
+
+    def spanning_cost(self, medal_mask):
+        """
+        Weight of a minimum spanning tree over the given medals, where
+        the weight of an edge is the cheaper of its two directions.
+        Any order of collecting the medals costs at least this much.
+        :param medal_mask (int) bitmask of the remaining medals
+        :return: (number) the weight of the tree
+        """
+        if medal_mask not in self._spanning_costs:
+            medals = [index for index in range(len(self.between))
+                      if medal_mask >> index & 1]
+            # Prim's algorithm on the dense graph of medals
+            best = {index: UNREACHABLE for index in medals[1:]}
+            latest = medals[0]
+            total = 0
+            while best:
+                for index in best:
+                    best[index] = min(best[index],
+                                      self.between[latest][index],
+                                      self.between[index][latest])
+                latest = min(best, key=best.get)
+                total += best.pop(latest)
+            self._spanning_costs[medal_mask] = total
+        return self._spanning_costs[medal_mask]
+
+    def tour_cost(self, first, medal_mask):
+        """
+        Exact cheapest cost of collecting the given medals, starting
+        from medal first (Held-Karp dynamic programming, memoized)
+        :param
+        first (int) index of the medal Sammy stands on
+        medal_mask (int) bitmask of the medals left after first
+        :return: (number) the cheapest cost or UNREACHABLE
+        """
+        if not medal_mask:
+            return 0
+        key = (first, medal_mask)
+        if key not in self._tour_costs:
+            self._tour_costs[key] = min(
+                self.between[first][index] +
+                self.tour_cost(index, medal_mask & ~(1 << index))
+                for index in range(len(self.between))
+                if medal_mask >> index & 1)
+        return self._tour_costs[key]
+
+
+def medal_distances(problem):
+    """
+    Return the MedalDistances of the given quest, computing them the
+    first time they are needed
+    :param problem (a Problem object) representing the quest
+    :return: MedalDistances object
+    """
+    if 'medal_distances' not in problem.precomputed:
+        problem.precomputed['medal_distances'] = MedalDistances(problem)
+    return problem.precomputed['medal_distances']
+
+
+class PathOracle(object):
+    """
+    Answer repeated queries for the cheapest cost between two positions
+    of a fixed maze.  The first query from a source cell runs Dijkstra's
+    algorithm from it and the whole tree of costs is cached, so later
+    queries from that source are table lookups.  The least recently
+    used trees are evicted once the cache is full.
+    The maze must not change while the oracle is in use, see
+    path_oracle for an oracle that is reset when a wall changes.
+
+    Arguments:
+    maze (a Maze object) with its adjacency tables built
+    capacity (int): the maximum number of trees cached - defaults to
+        ORACLE_CACHE_SIZE
+
+    Attributes:
+    maze (a Maze object)
+    trees (LRUCache object): maps each source cell to the array of the
+        costs from that cell, indexed by flat cell index
+    """
+
+    def __init__(self, maze, capacity=ORACLE_CACHE_SIZE):
+        self.maze = maze
+        self.trees = data_structures.LRUCache(capacity)
+
+    def cost(self, source, target):
+        """
+        Cheapest cost of going from the source to the target
+        :param
+        source (tuple) the starting position (x, y), e.g. Sammy's
+        target (tuple) the destination position (x, y), e.g. a medal's
+        :return: (number) the cost or UNREACHABLE
+        """
+        return self.costs(source, [target])[0]
+
+    def costs(self, source, targets):
+        """
+        Cheapest costs of going from the source to each target
+        :param
+        source (tuple) the starting position (x, y), e.g. Sammy's
+        targets (list of tuples) the destination positions (x, y)
+        :return: list of the costs (int) or UNREACHABLE, in the order
+                of the targets
+        """
+        source_cell = self.maze.cell(source)
+        tree = self.trees.get(source_cell)
+        if tree is None:
+            tree = array.array('d', dijkstra(self.maze, source_cell))
+            self.trees.put(source_cell, tree)
+        costs = [tree[self.maze.cell(target)] for target in targets]
+        return [int(cost) if cost != UNREACHABLE else UNREACHABLE
+                for cost in costs]
+
+    def hit_rate(self):
+        """
+        Fraction of the queries answered from the cache
+        :return: (float) between 0 and 1, 0 before the first query
+        """
+        queries = self.trees.hits + self.trees.misses
+        return self.trees.hits / queries if queries else 0.0
+
+    def memory(self):
+        """
+        Memory used by the cached trees
+        :return: (int) number of bytes
+        """
+        return sum(sys.getsizeof(tree)
+                   for tree in self.trees.entries.values())
+
+
+def path_oracle(problem, capacity=ORACLE_CACHE_SIZE):
+    """
+    Return the PathOracle of the given quest, creating it the first time
+    it is needed.  It is dropped with the other precomputed tables when
+    a wall is added or removed.
+    :param
+    problem (a Problem object) representing the quest
+    capacity (int): the maximum number of trees cached by a new oracle
+    :return: PathOracle object
+    """
+    if 'path_oracle' not in problem.precomputed:
+        problem.precomputed['path_oracle'] = PathOracle(problem.maze,
+                                                        capacity)
+    return problem.precomputed['path_oracle']
+
+
+class Landmarks(object):
+    """
+    Lower bounds on the cheapest cost between any two cells from the
+    costs to and from a few landmark cells (the ALT technique): by the
+    triangle inequality, the cost from u to v is at least
+    from_landmark[v] - from_landmark[u] and to_landmark[u] - to_landmark[v]
+    for every landmark.
+    The landmarks are chosen greedily, each as the reachable cell
+    farthest from Sammy's start and the landmarks chosen before it.
+
+    Arguments:
+    problem (a Problem object) representing the quest
+    count (int): the number of landmarks - defaults to LANDMARK_COUNT
+
+    Attributes:
+    cells (list of int): the flat index of each landmark cell
+    from_landmark (list of arrays): from_landmark[i][cell] is the
+        cheapest cost from landmark i to the given cell
+    to_landmark (list of arrays): to_landmark[i][cell] is the cheapest
+        cost from the given cell to landmark i
+    """
+
+    def __init__(self, problem, count=LANDMARK_COUNT):
+        maze = problem.maze
+        start = maze.cell(problem.mascot_position)
+        self.cells = []
+        self.from_landmark = []
+        self.to_landmark = []
+        # the cost from the closest landmark (or from the start)
+        closest = dijkstra(maze, start)
+        for index in range(count):
+            reachable = [(cost, cell) for cell, cost in enumerate(closest)
+                         if 0 < cost < UNREACHABLE]
+            if not reachable:
+                break  # every reachable cell is a landmark already
+            cost, landmark = max(reachable)
+            from_landmark = dijkstra(maze, landmark)
+            self.cells.append(landmark)
+            self.from_landmark.append(array.array('d', from_landmark))
+            self.to_landmark.append(
+                array.array('d', dijkstra(maze, landmark, reverse=True)))
+            closest = [min(cost, landmark_cost) for cost, landmark_cost
+                       in zip(closest, from_landmark)]
+
+    def lower_bound(self, source, target):
+        """
+        Lower bound on the cheapest cost from the source to the target
+        :param
+        source (int) flat index of the source cell
+        target (int) flat index of the target cell
+        :return: (number) the bound, UNREACHABLE if the target cannot be
+                reached from the source
+        """
+        bound = 0
+        for from_landmark, to_landmark in zip(self.from_landmark,
+                                              self.to_landmark):
+            forward = from_landmark[target] - from_landmark[source]
+            backward = to_landmark[source] - to_landmark[target]
+            # a difference of two UNREACHABLE costs is nan and bounds
+            # nothing: max keeps the bound when compared with nan
+            bound = max(bound, forward, backward)
+        return bound if bound == UNREACHABLE else int(bound)
+
+
+def landmarks(problem):
+    """
+    Return the Landmarks of the given quest, computing them the first
+    time they are needed
+    :param problem (a Problem object) representing the quest
+    :return: Landmarks object
+    """
+    if 'landmarks' not in problem.precomputed:
+        problem.precomputed['landmarks'] = Landmarks(problem)
+    return problem.precomputed['landmarks']
@@ -0,0 +1,234 @@
+"""
+Incremental replanning when the walls of the maze change
+
+IncrementalPlanner runs Lifelong Planning A* (LPA*) over the compact
+states of a quest.  It keeps its tables between calls to plan and
+listens to the maze (see Maze.add_listener): after a wall is added or
+removed, only the states whose cheapest path goes through the changed
+cell are searched again.
+
+    planner = IncrementalPlanner(quest)
+    solution = planner.plan()
+    quest.maze.add_wall((3, 4))
+    solution = planner.plan()  # repairs the previous search
+"""
+import collections
+import heapq
+import informed_search
+
+INFINITY = float('inf')
+
+# The virtual goal state: every state without medals left leads to it
+# at no cost, so the quest has a single goal
+GOAL = None
+
+
+class IncrementalPlanner(object):
+    """
+    Lifelong Planning A* search from Sammy's start to the collection of
+    all the medals, repaired incrementally when walls change
+
+    Arguments:
+    problem (a Problem object) representing the quest, in compact mode
+        and without macro moves
+    heuristic (a function): a consistent heuristic that does not depend
+        on the walls, such as gen_heuristic - defaults to gen_heuristic
+
+    Attributes:
+    problem (a Problem object) representing the quest
+    heuristic (a function): the heuristic function
+    g (dictionary): the cost of the cheapest path found to each state
+    rhs (dictionary): the cost of the cheapest path to each state
+        through the g values of its predecessors (one step lookahead)
+    nodes_expanded (int): the number of states expanded by the last
+        call to plan
+    """
+
+    def __init__(self, problem, heuristic=informed_search.gen_heuristic):
+        if not problem.compact or problem.macro:
+            raise ValueError('The incremental planner needs a compact '
+                             'problem without macro moves')
+        self.problem = problem
+        self.heuristic = heuristic
+        self.start = problem.start_state()
+        self.g = {}
+        self.rhs = {self.start: 0}
+        self.nodes_expanded = 0
+        self._fringe = []  # heap of (key, count, state), stale entries too
+        self._keys = {}  # the key of each state in the fringe
+        self._count = 0  # tie breaker for the heap entries
+        self._estimates = {GOAL: 0}  # heuristic values, walls independent
+        self._goals = set()  # the states without medals left seen so far
+        self._masks = collections.defaultdict(set)  # cell: medal masks seen
+        self._masks[self.start[0]].add(self.start[1])
+        self._push(self.start)
+        problem.maze.add_listener(self.maze_changed)
+
+    def plan(self):
+        """
+        Find the cheapest solution given the current walls, reusing the
+        search done by the previous calls
+        :return: list of actions representing the solution to the quest
+                or None if there is no solution
+        """
+        expanded = self.problem.nodes_expanded()
+        self._compute_shortest_path()
+        self.nodes_expanded = self.problem.nodes_expanded() - expanded
+        if self.g.get(GOAL, INFINITY) == INFINITY:
+            return None
+        state = min(self._goals, key=lambda goal: self.g.get(goal, INFINITY))
+        actions = []
+        while state != self.start:  # follow the cheapest predecessors
+            state, action, cost = min(
+                self._predecessors(state),
+                key=lambda move: self.g.get(move[0], INFINITY) + move[2])
+            actions.append(action)
+        actions.reverse()
+        return actions
+
+    def maze_changed(self, cell):
+        """
+        Update the states whose incoming moves changed when a wall was
+        added or removed at the given cell (see Maze.add_listener): the
+        states seen in that cell and its neighbors, and the states a
+        move out of them now leads to
+        :param cell: (int) flat index of the cell that changed
+        :return: None
+        """
+        maze = self.problem.maze
+        medal_bits = self.problem.medal_bits
+        x, y = maze.position(cell)
+        cells = [cell] + [maze.cell((x + dx, y + dy))
+                          for dx, dy in maze.moves.values()
+                          if maze.within_bounds((x + dx, y + dy))]
+        changed = set()
+        for changed_cell in cells:
+            for medal_mask in self._masks[changed_cell]:
+                changed.add((changed_cell, medal_mask))
+                if not medal_mask:
+                    continue  # a goal only leads to GOAL
+                for new_cell, action, cost in maze.adjacency[changed_cell]:
+                    changed.add((new_cell,
+                                 medal_mask & ~medal_bits.get(new_cell, 0)))
+        for state in changed:
+            self._masks[state[0]].add(state[1])
+            self._update(state)
+
+    def _compute_shortest_path(self):
+        """
+        Expand the locally inconsistent states in order of their keys
+        until the goal is consistent and no better path can be found
+        The states tied with GOAL are expanded too, since the states
+        without medals left leading to GOAL have the same key.
+        This is a private method.
+        :return: None
+        """
+        while True:
+            top = self._top()
+            if (top is None or top > self._key(GOAL)) and \
+                    self.rhs.get(GOAL, INFINITY) == self.g.get(GOAL, INFINITY):
+                return
+            key, count, state = heapq.heappop(self._fringe)
+            del self._keys[state]
+            if self.g.get(state, INFINITY) > self.rhs.get(state, INFINITY):
+                self.g[state] = self.rhs[state]  # overconsistent
+            else:
+                self.g[state] = INFINITY  # underconsistent
+                self._update(state)
+            for successor in self._successors(state):
+                self._update(successor)
+
+    def _update(self, state):
+        """
+        Recompute the rhs value of the state and put it in the fringe if
+        it is locally inconsistent - private method
+        :param state: a compact state or GOAL
+        :return: None
+        """
+        if state == GOAL:
+            self.rhs[GOAL] = min((self.g.get(goal, INFINITY)
+                                  for goal in self._goals), default=INFINITY)
+        elif state != self.start:
+            self.rhs[state] = min(
+                (self.g.get(predecessor, INFINITY) + cost
+                 for predecessor, action, cost in self._predecessors(state)),
+                default=INFINITY)
+        self._keys.pop(state, None)  # its heap entry becomes stale
+        if self.g.get(state, INFINITY) != self.rhs.get(state, INFINITY):
+            self._push(state)
+
+    def _push(self, state):
+        """
+        Add the state to the fringe with its current key - private method
+        :param state: a compact state or GOAL
+        :return: None
+        """
+        key = self._key(state)
+        self._keys[state] = key
+        self._count += 1
+        heapq.heappush(self._fringe, (key, self._count, state))
+
+    def _top(self):
+        """
+        Return the smallest key in the fringe, dropping stale entries
+        This is a private method.
+        :return: (tuple) the key, or None if the fringe is empty
+        """
+        fringe = self._fringe
+        while fringe:
+            key, count, state = fringe[0]
+            if self._keys.get(state) == key:
+                return key
+            heapq.heappop(fringe)
+        return None
+
+    def _key(self, state):
+        """
+        Return the priority of the state - private method
+        :param state: a compact state or GOAL
+        :return: (tuple) the estimated cost of a solution through the
+                state and the cost to reach it
+        """
+        cost = min(self.g.get(state, INFINITY), self.rhs.get(state, INFINITY))
+        if state not in self._estimates:
+            self._estimates[state] = self.heuristic(state, self.problem)
+        return cost + self._estimates[state], cost
+
+    def _successors(self, state):
+        """
+        Return the states reachable in one move from the given state
+        A state without medals left only leads to GOAL.
+        This is a private method.
+        :param state: a compact state or GOAL
+        :return: list of states
+        """
+        if state == GOAL:
+            return []
+        cell, medal_mask = state
+        if not medal_mask:
+            self._goals.add(state)
+            return [GOAL]
+        successors = []
+        for successor, action, cost in self.problem.expand(state):
+            self._masks[successor[0]].add(successor[1])
+            successors.append(successor)
+        return successors
+
+    def _predecessors(self, state):
+        """
+        Return the moves leading to the given state from the states that
+        are not goals, using the current walls - private method
+        :param state: a compact state
+        :return: list of tuples (predecessor state, action, cost)
+        """
+        cell, medal_mask = state
+        medal_bit = self.problem.medal_bits.get(cell, 0)
+        if medal_mask & medal_bit:
+            return []  # Sammy would have collected the medal here
+        masks = [medal_mask | medal_bit] if medal_bit else []
+        if medal_mask:
+            masks.append(medal_mask)
+        return [((predecessor, mask), action, cost)
+                for predecessor, action, cost in
+                self.problem.maze.reverse_table()[cell]
+                for mask in masks]
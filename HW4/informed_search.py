@@ -12,38 +12,257 @@ Your task for homework 4 is to implement:
 2.  single_heuristic
 3.  better_heuristic
 4.  gen_heuristic
+
+The mst_heuristic and tsp_heuristic use the true path costs between
+medals computed once per quest (see distances.py).
 """
+import functools
+import time
 import data_structures
+import distances
+import search_stream
+
+# Number of heuristic values memoized by astar during a search
+HEURISTIC_CACHE_SIZE = 100000
+
+# Initial heuristic weight of arastar and how much it drops per solution
+ANYTIME_WEIGHT = 3.0
+ANYTIME_DECREMENT = 0.5
+
+# Number of states remembered by idastar within one iteration
+TRANSPOSITION_TABLE_SIZE = 100000
+
+# Smallest number of medals for which pathfinder_batch uses numpy
+VECTORIZE_MEDAL_COUNT = 32
 
+# Largest number of medals for which tsp_heuristic solves the exact
+# collection order, beyond that it falls back to mst_heuristic
+TSP_MEDAL_LIMIT = 16
 
-def astar(problem, heuristic):
+
+def astar(problem, heuristic, indexed=False,
+          cache_size=HEURISTIC_CACHE_SIZE, weight=1, closed_backing='set'):
     """
     A* graph search algorithm
     returns a solution for the given search problem
+    The heuristic values are memoized in a least recently used cache
+    for the duration of the search, the cache hits and misses are
+    recorded in problem.statistics.
+    With a weight above 1 (weighted A*), the solution costs at most
+    weight times the optimal cost but is usually found much faster.
     :param
     problem (a Problem object) representing the quest
             see Problem class definition in spartanquest.py
     heuristic (a function) the heuristic function to be used
+    indexed (Boolean) if True, the fringe is an indexed priority queue
+            holding each state at most once - defaults to False
+    cache_size (int) the number of heuristic values to keep, 0 disables
+            the cache - defaults to HEURISTIC_CACHE_SIZE
+    weight (number) the factor applied to the heuristic - defaults to 1
+    closed_backing (string) 'set' or 'compact', see ClosedSet
+            - defaults to 'set'
     :return: list of actions representing the solution to the quest
                 or None if there is no solution
     """
-    closed = set()  # keep track of our explored states
-    fringe = data_structures.PriorityQueue()  # for a*, the fringe is a priority queue
+    cache = data_structures.LRUCache(cache_size)
+
+    def priority(node):
+        estimate = cache.get(node.state)
+        if estimate is None:
+            estimate = heuristic(node.state, problem)
+            cache.put(node.state, estimate)
+        return node.cumulative_cost + weight * estimate
+
+    if indexed:
+        fringe = data_structures.IndexedPriorityQueue()
+    else:
+        fringe = data_structures.PriorityQueue()  # for a*, the fringe is a priority queue
+    solution = search_stream.run(search_stream.graph_search(
+        problem, fringe, priority, closed_backing))
+    problem.statistics['Heuristic cache hits'] = cache.hits
+    problem.statistics['Heuristic cache misses'] = cache.misses
+    return solution
+
+
+def arastar(problem, heuristic, weight=ANYTIME_WEIGHT,
+            decrement=ANYTIME_DECREMENT, time_budget=None):
+    """
+    Anytime repairing A* (ARA*) search algorithm
+    Generator of successively cheaper (or better bounded) solutions for
+    the given search problem, one for each weight.  A weighted A* search
+    is run with a decreasing weight, reusing the states already
+    explored: states that got cheaper after being explored are kept
+    aside and only those are searched again.
+    Stops once the solution is proven optimal, when no cheaper solution
+    exists or when the time budget is spent.  Raises TimeoutError if the
+    time budget is spent before the first solution is found, so that
+    running out of time is not mistaken for a quest without solution.
+    :param
+    problem (a Problem object) representing the quest
+            see Problem class definition in spartanquest.py
+    heuristic (a function) a consistent heuristic function
+    weight (number) the initial weight of the heuristic
+            - defaults to ANYTIME_WEIGHT
+    decrement (number) how much the weight drops after each solution
+            - defaults to ANYTIME_DECREMENT
+    time_budget (number) seconds allowed for the search, None for no
+            limit - defaults to None
+    :return: generator of tuples (solution, cost, bound) where solution
+            is the list of actions, cost its total cost, and bound an
+            upper bound on cost / optimal cost
+    """
+    if time_budget is None:
+        deadline = float('inf')
+    else:
+        deadline = time.monotonic() + time_budget
+    estimates = {}  # heuristic value of each state reached
+
+    def estimate(state):
+        if state not in estimates:
+            estimates[state] = heuristic(state, problem)
+        return estimates[state]
+
     state = problem.start_state()
-    root = data_structures.Node(state, None, None)
-    fringe.push(root, 0)
-    while not fringe.is_empty():
-        node = fringe.pop()
-        if problem.is_goal(node.state):
-            return node.solution()  # we found a solution
-        if node.state not in closed:  # we are implementing graph search
+    best_nodes = {state: data_structures.Node(state, None, None)}
+    fringe = data_structures.IndexedPriorityQueue()
+    fringe.push_or_decrease(state, best_nodes[state], weight * estimate(state))
+    closed = set()
+    inconsistent = {}  # explored states whose cost dropped afterwards
+    incumbent = None  # the goal Node of the cheapest solution so far
+    reported = None  # the cost and bound yielded last
+    while True:
+        while not fringe.is_empty():
+            if time.monotonic() > deadline:
+                if reported is None:
+                    raise TimeoutError('The time budget ran out before '
+                                       'the first solution was found')
+                return  # out of time, the last solution yielded stands
+            if incumbent is not None and \
+                    fringe.min_priority() >= incumbent.cumulative_cost:
+                break  # no cheaper solution within this weight
+            node = fringe.pop()
             closed.add(node.state)
+            if problem.is_goal(node.state):
+                if incumbent is None or \
+                        node.cumulative_cost < incumbent.cumulative_cost:
+                    incumbent = node
+                continue
             for child_state, action, action_cost in problem.expand(node.state):
-                child_node = data_structures.Node(child_state, node, action, node.cumulative_cost + action_cost)
-                fringe.push(child_node, child_node.cumulative_cost + heuristic(child_state, problem))
+                cost = node.cumulative_cost + action_cost
+                best_node = best_nodes.get(child_state)
+                if best_node is not None and \
+                        best_node.cumulative_cost <= cost:
+                    continue
+                child_node = data_structures.Node(child_state, node, action,
+                                                  cost)
+                best_nodes[child_state] = child_node
+                if child_state in closed:
+                    inconsistent[child_state] = child_node
+                else:
+                    fringe.push_or_decrease(
+                        child_state, child_node,
+                        cost + weight * estimate(child_state))
+        if incumbent is None:
+            return  # Failure -  no solution was found
+        pending = fringe.items() + list(inconsistent.values())
+        lower_bound = min((node.cumulative_cost + estimate(node.state)
+                           for node in pending),
+                          default=incumbent.cumulative_cost)
+        if lower_bound:
+            bound = max(1, min(weight,
+                               incumbent.cumulative_cost / lower_bound))
+        else:
+            bound = 1
+        if (incumbent.cumulative_cost, bound) != reported:
+            reported = (incumbent.cumulative_cost, bound)
+            yield incumbent.solution(), incumbent.cumulative_cost, bound
+        if bound <= 1:
+            return  # the solution is optimal
+        # search again with a smaller weight from the pending states
+        weight = max(1, weight - decrement)
+        fringe = data_structures.IndexedPriorityQueue()
+        for node in pending:
+            fringe.push_or_decrease(node.state, node, node.cumulative_cost +
+                                    weight * estimate(node.state))
+        closed = set()
+        inconsistent = {}
+
+
+def idastar(problem, heuristic, table_size=TRANSPOSITION_TABLE_SIZE):
+    """
+    Iterative deepening A* search algorithm
+    returns a solution for the given search problem
+    Runs depth first searches bounded by the f value (cost + heuristic),
+    raising the bound to the smallest f value that exceeded it, so the
+    memory used is linear in the depth of the solution plus a
+    transposition table of at most table_size states.
+    :param
+    problem (a Problem object) representing the quest
+            see Problem class definition in spartanquest.py
+    heuristic (a function) the heuristic function to be used
+    table_size (int) the number of states whose cheapest cost is
+            remembered within an iteration, 0 disables the table
+            - defaults to TRANSPOSITION_TABLE_SIZE
+    :return: list of actions representing the solution to the quest
+                or None if there is no solution
+    """
+    root = data_structures.Node(problem.start_state(), None, None)
+    if problem.is_goal(root.state):
+        return root.solution()
+    bound = heuristic(root.state, problem)
+    while bound != float('inf'):
+        node, bound = _bounded_search(problem, heuristic, root, bound,
+                                      table_size)
+        if node is not None:
+            return node.solution()  # we found a solution
     return None  # Failure -  no solution was found
 
 
+def _bounded_search(problem, heuristic, root, bound, table_size):
+    """
+    One iteration of idastar: depth first search of the nodes whose f
+    value does not exceed the bound.  This is a private function.
+    :param
+    problem (a Problem object) representing the quest
+    heuristic (a function) the heuristic function to be used
+    root (a Node object) the root of the search
+    bound (number) the largest f value explored
+    table_size (int) the maximum size of the transposition table
+    :return: (tuple) the goal Node found or None, and the smallest f
+            value that exceeded the bound
+    """
+    next_bound = float('inf')
+    table = {}  # cheapest cost seen for each state in this iteration
+    on_path = {root.state}  # states from the root to the current node
+    stack = [(root, iter(problem.expand(root.state)))]
+    while stack:
+        node, children = stack[-1]
+        for child_state, action, action_cost in children:
+            if child_state in on_path:
+                continue  # never loop back on the current path
+            cost = node.cumulative_cost + action_cost
+            f_value = cost + heuristic(child_state, problem)
+            if f_value > bound:
+                next_bound = min(next_bound, f_value)
+                continue
+            if table_size:
+                seen = table.get(child_state)
+                if seen is not None and seen <= cost:
+                    continue  # already explored at least as cheaply
+                if seen is not None or len(table) < table_size:
+                    table[child_state] = cost
+            child_node = data_structures.Node(child_state, node, action, cost)
+            if problem.is_goal(child_state):
+                return child_node, next_bound
+            stack.append((child_node, iter(problem.expand(child_state))))
+            on_path.add(child_state)
+            break
+        else:  # all the children of this node have been explored
+            stack.pop()
+            on_path.discard(node.state)
+    return None, next_bound
+
+
 def null_heuristic(state, problem):
     """
     Trivial heuristic to be used with A*.
@@ -71,8 +290,9 @@ def single_heuristic(state, problem):
     :return: integer representing heuristic value from Sammy's current position to last medal (using Manhattan
     """
     if not problem.is_goal(state):
-        return abs(state[0][0] - state[1][0][0]) + abs(
-            state[0][1] - state[1][0][1])  # get Manhattan distance from Sammy's current position to last medal
+        sammy, medals = problem.decode_state(state)
+        return abs(sammy[0] - medals[0][0]) + abs(
+            sammy[1] - medals[0][1])  # get Manhattan distance from Sammy's current position to last medal
     else:
         return 0
 
@@ -89,7 +309,7 @@ def better_heuristic(state, problem):
     :return: integer representing a better heuristic estimation
     """
     if not problem.is_goal(state):  # if the state is not the goal state, calculate heuristic using Manhattan distance
-        sammy, medals = state       # unpack state tuple into sammy (current position), medals (tuple of remaining medals)
+        sammy, medals = problem.decode_state(state)  # unpack state tuple into sammy (current position), medals (tuple of remaining medals)
         medal = medals[0]
         return pathfinder(sammy, medal, problem)
     else:
@@ -108,12 +328,91 @@ def gen_heuristic(state, problem):
     :return: integer indicating the closest least cost heuristic
     """
     if not problem.is_goal(state):  # if the state is not the goal state, calculate heuristic using Manhattan distance
-        sammy, medals = state   
-        return max(pathfinder(sammy, medal, problem) for medal in medals)  # get the front of the queue
+        if problem.compact and \
+                state[1].bit_count() >= VECTORIZE_MEDAL_COUNT and \
+                _numpy() is not None:  # many medals left to collect
+            cell, medal_mask = state  # select the medals without tuples
+            sammy = problem.maze.position(cell)
+            medals = _medal_array(medal_mask, problem)
+        else:
+            sammy, medals = problem.decode_state(state)
+        return max(pathfinder_batch(sammy, medals, problem))
     else:
         return 0
 
 
+def mst_heuristic(state, problem):
+    """
+    Cost to the nearest remaining medal plus the weight of a minimum
+    spanning tree over the remaining medals, or the cost to the farthest
+    remaining medal if that is higher, using the true path costs in the
+    maze (walls included).  Admissible and consistent.
+    :param
+    state: A state in either representation (see Problem.start_state)
+    problem: (a Problem object) representing the quest
+    :return: integer lower bound on the carrots needed to finish
+    """
+    cell, medal_mask = problem.encode_state(state)
+    if not medal_mask:
+        return 0
+    medal_distances = distances.medal_distances(problem)
+    return max(medal_distances.nearest(cell, medal_mask) +
+               medal_distances.spanning_cost(medal_mask),
+               medal_distances.farthest(cell, medal_mask))
+
+
+def tsp_heuristic(state, problem):
+    """
+    Exact cost of collecting the remaining medals in the best order,
+    using the true path costs in the maze (walls included).
+    Memoized per remaining medal set.  Quests with more than
+    TSP_MEDAL_LIMIT medals use mst_heuristic instead.
+    :param
+    state: A state in either representation (see Problem.start_state)
+    problem: (a Problem object) representing the quest
+    :return: integer carrots needed to finish
+    """
+    if len(problem.medal_list) > TSP_MEDAL_LIMIT:
+        return mst_heuristic(state, problem)
+    cell, medal_mask = problem.encode_state(state)
+    if not medal_mask:
+        return 0
+    medal_distances = distances.medal_distances(problem)
+    return min(to_medal[cell] +
+               medal_distances.tour_cost(index, medal_mask & ~(1 << index))
+               for index, to_medal in enumerate(medal_distances.to_medal)
+               if medal_mask >> index & 1)
+
+
+def landmark_heuristic(state, problem):
+    """
+    Lower bound on the cost to the most expensive remaining medal, from
+    landmark (ALT) lower bounds on the true path costs in the maze
+    (walls included), or from the pathfinder cost if that is higher.
+    Admissible and consistent, and never lower than better_heuristic
+    or gen_heuristic.  The bounds are memoized per cell.
+    :param
+    state: A state in either representation (see Problem.start_state)
+    problem: (a Problem object) representing the quest
+    :return: integer lower bound on the carrots needed to finish
+    """
+    cell, medal_mask = problem.encode_state(state)
+    if not medal_mask:
+        return 0
+    if 'landmark_bounds' not in problem.precomputed:
+        problem.precomputed['landmark_bounds'] = {}
+    bounds = problem.precomputed['landmark_bounds']  # per cell and medal
+    if cell not in bounds:
+        sammy = problem.maze.position(cell)
+        landmarks = distances.landmarks(problem)
+        bounds[cell] = [max(pathfinder(sammy, medal, problem),
+                            landmarks.lower_bound(cell,
+                                                  problem.maze.cell(medal)))
+                        for medal in problem.medal_list]
+    return max(bound for index, bound in enumerate(bounds[cell])
+               if medal_mask >> index & 1)
+
+
 def pathfinder(sammy, medal, problem):
     """
     Calculates heuristic value for one medal using Manhattan distance with consideration of carrot cost
@@ -137,3 +436,62 @@ def pathfinder(sammy, medal, problem):
         else:
             return (problem.cost['W'] * (sammy[0] - medal[0])) + (
                     problem.cost['N'] * (sammy[1] - medal[1]))  # sammy is below and to the right of medal
+
+
+def pathfinder_batch(sammy, medals, problem):
+    """
+    Calculates the pathfinder heuristic value for each of the given medals
+    With numpy available and at least VECTORIZE_MEDAL_COUNT medals, all
+    the values are computed in a single vectorized expression.
+    :param
+    sammy: tuple indicating x,y position of sammy
+    medals: sequence of tuples (or numpy array of rows) indicating x,y
+            positions of medals
+    problem: (a Problem object) representing the quest
+    :return: list of integer values, in the order of the medals
+    """
+    if len(medals) < VECTORIZE_MEDAL_COUNT or _numpy() is None:
+        if hasattr(medals, 'tolist'):  # numpy rows to Python integers
+            medals = medals.tolist()
+        return [pathfinder(sammy, medal, problem) for medal in medals]
+    numpy = _numpy()
+    cost = problem.cost
+    offset = numpy.asarray(medals) - sammy  # (dx, dy) from sammy to each medal
+    return (numpy.where(offset[:, 0] >= 0, cost['E'] * offset[:, 0],
+                        -cost['W'] * offset[:, 0]) +
+            numpy.where(offset[:, 1] >= 0, cost['S'] * offset[:, 1],
+                        -cost['N'] * offset[:, 1])).tolist()
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """
+    Import numpy on first use, so that quests with few medals never pay
+    for its import
+    This is a private function.
+    :return: the numpy module, or None if it is not installed
+    """
+    try:
+        import numpy  # optional, used by pathfinder_batch for many medals
+    except ImportError:
+        return None
+    return numpy
+
+
+def _medal_array(medal_mask, problem):
+    """
+    Positions of the medals in the given bitmask as a numpy array
+    This is a private function.
+    :param
+    medal_mask: bitmask of the remaining medals (see Problem.start_state)
+    problem: (a Problem object) representing the quest
+    :return: numpy array with one x,y row per remaining medal
+    """
+    numpy = _numpy()
+    if 'medal_array' not in problem.precomputed:
+        problem.precomputed['medal_array'] = numpy.array(problem.medal_list)
+    all_medals = problem.precomputed['medal_array']
+    mask_bytes = medal_mask.to_bytes((len(all_medals) + 7) // 8, 'little')
+    remaining = numpy.unpackbits(numpy.frombuffer(mask_bytes, numpy.uint8),
+                                 bitorder='little')[:len(all_medals)]
+    return all_medals[remaining.astype(bool)]
@@ -0,0 +1,314 @@
+"""
+Level synchronous breadth first search in several processes
+
+pbfs returns the same solution as uninformed_search.bfs, but the states
+are sharded by the hash of their integer key (see Problem.state_key)
+across persistent worker processes.  Each worker owns the closed set of
+its shard and expands the frontier states it owns, one level at a time:
+
+    expand   each worker expands its part of the level and writes the
+             children to a shared memory block, grouped by the shard
+             owning them, as (child key, parent index, rank) records
+    receive  each worker reads the records sent to it by every worker,
+             drops the states it has already reached and sorts the new
+             ones in serial bfs order: by the index of their first
+             parent in the level, then by their rank in its expansion
+    rank     each worker numbers its new states from the sorted orders
+             of all the shards, so the next level is ordered exactly as
+             the serial bfs queue
+
+Only the records and the sorted orders go through shared memory, the
+pipes to the workers carry the commands and the block names.  Once a
+level contains a goal, the path is traced back through the parent
+indexes kept by the workers and replayed with Problem.expand.
+
+    solution = pbfs(quest, workers=4)
+"""
+import array
+import bisect
+import multiprocessing
+import os
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+import data_structures
+
+# Fibonacci hashing of the state keys to spread them over the shards
+SHARD_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# Number of int64 fields in a child record: key, parent index, rank
+RECORD_SIZE = 3
+
+# Bits of the rank of a child in its parent's expansion in an order key
+RANK_BITS = 8
+
+
+def pbfs(problem, workers=None):
+    """
+    Breadth first graph search sharded across worker processes
+    The nodes expanded by the workers are recorded in problem.statistics.
+    :param
+    problem (a Problem object) representing the quest
+            see Problem class definition in spartanquest.py
+    workers (int) number of worker processes, None for one worker per
+            CPU
+    :return: list of actions representing the solution to the quest
+            or None if there is no solution
+    :raise ValueError: if workers is less than 1
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    elif workers < 1:
+        raise ValueError(f'The number of workers must be at least 1, '
+                         f'not {workers}')
+    if problem.is_goal(problem.start_state()):
+        return []
+    snapshot = problem.snapshot()._replace(compact=True)  # compact states
+    resource_tracker.ensure_running()  # shared by all the workers
+    connections = []
+    processes = []
+    for shard in range(workers):
+        connection, worker_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_shard_worker, daemon=True,
+            args=(type(problem), snapshot, shard, workers,
+                  worker_connection))
+        process.start()
+        worker_connection.close()
+        connections.append(connection)
+        processes.append(process)
+    solution = None
+    try:
+        start_key = problem.state_key(problem.start_state())
+        _command(connections, 'start', [start_key] * workers)
+        level = 0
+        while True:
+            outboxes = _command(connections, 'expand', [None] * workers)
+            inboxes = [[(name, blocks[shard]) for name, blocks in outboxes]
+                       for shard in range(workers)]
+            orders = _command(connections, 'receive', inboxes)
+            ranked = _command(connections, 'rank', [orders] * workers)
+            level += 1
+            if not any(count for count, goal in ranked):
+                break  # Failure -  no solution was found
+            goals = [goal for count, goal in ranked if goal is not None]
+            if goals:
+                ranks = _trace(connections, level, min(goals))
+                solution = _replay(problem, ranks)
+                break
+    finally:
+        counts = _command(connections, 'stop', [None] * workers)
+        for process in processes:
+            process.join()
+    problem.statistics['Nodes expanded by the workers'] = sum(counts)
+    return solution
+
+
+def _owner(key, shards):
+    """
+    Return the shard owning the state with the given key
+    This is a private function.
+    :param
+    key (int) the key of the state, see Problem.state_key
+    shards (int) the number of shards
+    :return: (int) the index of the shard
+    """
+    return (key * SHARD_MULTIPLIER >> 17) % shards
+
+
+def _command(connections, command, arguments):
+    """
+    Send a command to every worker and wait for all their replies
+    This is a private function.
+    :param
+    connections (list) the pipe connections to the workers
+    command (string) the name of the command
+    arguments (list) the argument of the command for each worker
+    :return: list of the replies of the workers
+    """
+    for connection, argument in zip(connections, arguments):
+        connection.send((command, argument))
+    replies = [connection.recv() for connection in connections]
+    for reply in replies:
+        if isinstance(reply, Exception):
+            raise reply
+    return replies
+
+
+def _trace(connections, level, index):
+    """
+    Follow the parent indexes kept by the workers from the given state
+    back to the start state
+    This is a private function.
+    :param
+    connections (list) the pipe connections to the workers
+    level (int) the level of the state
+    index (int) the index of the state in its level
+    :return: list of the ranks of the moves from the start state
+    """
+    ranks = []
+    while level > 0:
+        replies = _command(connections, 'trace',
+                           [(level, index)] * len(connections))
+        index, rank = next(reply for reply in replies if reply is not None)
+        ranks.append(rank)
+        level -= 1
+    ranks.reverse()
+    return ranks
+
+
+def _replay(problem, ranks):
+    """
+    Rebuild the solution from the ranks of its moves in the expansions
+    of the states along the path
+    This is a private function.
+    :param
+    problem (a Problem object) representing the quest
+    ranks (list of ints) see _trace
+    :return: list of actions representing the solution
+    """
+    node = data_structures.Node(problem.start_state(), None, None)
+    for rank in ranks:
+        state, action, action_cost = problem.expand(node.state)[rank]
+        node = data_structures.Node(state, node, action,
+                                    node.cumulative_cost + action_cost)
+    return node.solution()
+
+
+def _shard_worker(problem_class, snapshot, shard, shards, connection):
+    """
+    Serve the commands of pbfs for one shard until it is stopped
+    This is a private function.
+    :param
+    problem_class (class) the Problem class
+    snapshot (Snapshot) the quest in compact mode, see Problem.snapshot
+    shard (int) the index of this shard
+    shards (int) the number of shards
+    connection (Connection) the pipe connection to pbfs
+    :return: None
+    """
+    problem = problem_class.from_snapshot(snapshot)
+    medal_count = len(problem.medal_list)
+    medal_mask = (1 << medal_count) - 1
+    rank_mask = (1 << RANK_BITS) - 1
+    closed = set()  # the keys of the states of this shard reached so far
+    levels = []  # per level: maps the index of a state to (parent, rank)
+    frontier = []  # (index, key) of the states of the level, in order
+    new_states = []  # (order, key) of the next level, in order
+    blocks = {}  # the shared memory blocks created by this worker
+    while True:
+        command, argument = connection.recv()
+        try:
+            if command == 'start':
+                if _owner(argument, shards) == shard:
+                    closed.add(argument)
+                    frontier = [(0, argument)]
+                levels.append({})
+                reply = None
+            elif command == 'expand':
+                outgoing = [array.array('q') for _ in range(shards)]
+                for index, key in frontier:
+                    state = (key >> medal_count, key & medal_mask)
+                    for rank, (child, action, action_cost) in \
+                            enumerate(problem.expand(state)):
+                        child_key = child[0] << medal_count | child[1]
+                        outgoing[_owner(child_key, shards)].extend(
+                            (child_key, index, rank))
+                reply = _publish(blocks, 'outbox', outgoing)
+            elif command == 'receive':
+                first = {}  # the smallest order key of each new state
+                for name, (offset, count) in argument:
+                    block = shared_memory.SharedMemory(name)
+                    records = block.buf.cast('q')[offset:offset + count]
+                    for position in range(0, count, RECORD_SIZE):
+                        key = records[position]
+                        if key in closed:
+                            continue
+                        order = records[position + 1] << RANK_BITS | \
+                            records[position + 2]
+                        if order < first.get(key, order + 1):
+                            first[key] = order
+                    records.release()
+                    block.close()
+                closed.update(first)
+                new_states = sorted((order, key)
+                                    for key, order in first.items())
+                name, locations = _publish(
+                    blocks, 'orders',
+                    [array.array('q', (order for order, key in new_states))])
+                reply = name, len(new_states)
+            elif command == 'rank':
+                attached = [shared_memory.SharedMemory(name)
+                            for name, count in argument]
+                orders = [block.buf.cast('q')[:count] for block, (name, count)
+                          in zip(attached, argument)]
+                others = [orders[other] for other in range(shards)
+                          if other != shard]
+                parents = {}
+                frontier = []
+                for position, (order, key) in enumerate(new_states):
+                    index = position + sum(bisect.bisect_left(keys, order)
+                                           for keys in others)
+                    parents[index] = (order >> RANK_BITS, order & rank_mask)
+                    frontier.append((index, key))
+                levels.append(parents)
+                for keys in orders:
+                    keys.release()
+                for block in attached:
+                    block.close()
+                goal = next((index for index, key in frontier
+                             if not key & medal_mask), None)
+                reply = len(frontier), goal
+            elif command == 'trace':
+                level, index = argument
+                reply = levels[level].get(index)
+            else:  # stop
+                _release(blocks)
+                connection.send(problem.nodes_expanded())
+                return
+        except Exception as error:  # report it to pbfs
+            reply = error
+        connection.send(reply)
+
+
+def _publish(blocks, role, arrays):
+    """
+    Copy the given arrays to a new shared memory block, replacing the
+    previous block with the same role
+    This is a private function.
+    :param
+    blocks (dictionary) the blocks created by this worker, by role
+    role (string) 'outbox' or 'orders'
+    arrays (list) the int64 arrays to copy, one after the other
+    :return: (tuple) the name of the block and a list of tuples (offset,
+            count) locating each array in it, in 8 byte items
+    """
+    _release(blocks, role)
+    size = sum(len(items) for items in arrays)
+    block = shared_memory.SharedMemory(create=True, size=max(8, 8 * size))
+    blocks[role] = block
+    data = block.buf.cast('q')
+    locations = []
+    offset = 0
+    for items in arrays:
+        data[offset:offset + len(items)] = items
+        locations.append((offset, len(items)))
+        offset += len(items)
+    data.release()
+    return block.name, locations
+
+
+def _release(blocks, role=None):
+    """
+    Close and unlink the shared memory blocks of this worker with the
+    given role, or all of them
+    This is a private function.
+    :param
+    blocks (dictionary) the blocks created by this worker, by role
+    role (string) the role of the block to release, None for all
+    :return: None
+    """
+    for name in [role] if role else list(blocks):
+        block = blocks.pop(name, None)
+        if block is not None:
+            block.close()
+            block.unlink()
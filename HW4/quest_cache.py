@@ -0,0 +1,220 @@
+# ----------------------------------------------------------------------
+# Name:     quest_cache
+# Purpose:  Save parsed quests and their precomputed tables in binary
+# ----------------------------------------------------------------------
+"""
+Binary cache of parsed quests
+
+Usage:  quest_cache.py quest_file [quest_file ...] [--no-tables]
+
+A cache file holds a parsed quest: the wall bitmap, Sammy's cell, the
+medal cells and the cost table, optionally followed by the masks of
+the moves out of every cell (see Maze.adjacency) and the cost from
+every cell to each medal (see distances.py).  It is keyed by the
+SHA-256 digest of the quest file it was built from, so a cache left
+over from an edited quest file, from a different cost table or from
+another version of this format is detected as stale and rebuilt.
+
+The command line builds the cache file next to each quest file.
+
+Example:  quest_cache.py questB.txt questG.txt
+"""
+import argparse
+import gc
+import hashlib
+import marshal
+import os
+import struct
+import distances
+import spartanquest
+
+# Suffix appended to the quest file name to name its cache file
+CACHE_SUFFIX = '.sqc'
+
+# Bump when the layout of the cache files changes
+FORMAT_VERSION = 2
+
+# magic, version, width, height, Sammy's cell, number of medals, flags,
+# digest of the quest file
+HEADER = struct.Struct('<4sHIIIIB32s')
+MAGIC = b'SQST'
+COST = struct.Struct('<cI')  # action, cost
+LENGTH = struct.Struct('<Q')  # size of a table in bytes
+
+# Flag set when the move masks and medal distance tables are included
+TABLES = 1
+
+
+def source_digest(quest_file):
+    """
+    Compute the key of a quest file in the cache
+    :param quest_file: (string) name of the quest file
+    :return: (bytes) the SHA-256 digest of the file
+    """
+    with open(quest_file, 'rb') as source:
+        return hashlib.sha256(source.read()).digest()
+
+
+def save(quest, cache_file, digest, tables=True):
+    """
+    Write the quest to the given cache file
+    The file is replaced atomically so that concurrent readers never see
+    a partial cache.
+    :param
+    quest (a Problem object) representing the quest
+    cache_file (string) name of the cache file
+    digest (bytes) digest of the quest file, see source_digest
+    tables (Boolean) include the move masks and medal distance tables
+    :return: None
+    """
+    snapshot = quest.snapshot()
+    if quest.prune:  # the cache holds the tables of the whole maze
+        quest = spartanquest.Problem.from_snapshot(
+            snapshot._replace(compact=False, macro=False, prune=False))
+    medal_cells = snapshot.medal_cells
+    flags = TABLES if tables else 0
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, snapshot.width,
+                         snapshot.height, snapshot.mascot_cell,
+                         len(medal_cells), flags, digest)]
+    parts += [COST.pack(action.encode(), quest.cost[action])
+              for action in quest.moves]
+    parts.append(struct.pack(f'<{len(medal_cells)}I', *medal_cells))
+    parts.append(snapshot.walls)
+    if tables:
+        parts.append(quest.maze.adjacency.masks)  # one byte per cell
+        data = marshal.dumps(distances.medal_distances(quest).to_medal)
+        parts += [LENGTH.pack(len(data)), data]
+    temporary_file = f'{cache_file}.{os.getpid()}.tmp'
+    with open(temporary_file, 'wb') as cache:
+        cache.writelines(parts)
+    os.replace(temporary_file, cache_file)
+
+
+def load(cache_file, digest, compact=False, macro=False, prune=False):
+    """
+    Read a quest from the given cache file
+    :param
+    cache_file (string) name of the cache file
+    digest (bytes) digest of the quest file, see source_digest
+    compact (Boolean) see the Problem class
+    macro (Boolean) see the Problem class
+    prune (Boolean) see the Problem class
+    :return: a Problem object, or None if the cache file is missing,
+            stale or damaged
+    """
+    collecting = gc.isenabled()
+    gc.disable()  # the tables hold millions of objects but no cycles
+    try:
+        with open(cache_file, 'rb') as cache:
+            data = memoryview(cache.read())
+        return _decode(data, digest, compact, macro, prune)
+    except (OSError, ValueError, EOFError, TypeError, struct.error):
+        return None
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def _decode(data, digest, compact, macro, prune):
+    """
+    Decode the contents of a cache file - private function
+    :param
+    data (memoryview) the contents of the cache file
+    digest (bytes) digest of the quest file, see source_digest
+    compact (Boolean) see the Problem class
+    macro (Boolean) see the Problem class
+    prune (Boolean) see the Problem class
+    :return: a Problem object, or None if the cache is stale
+    """
+    magic, version, width, height, mascot_cell, medal_count, flags, \
+        cached_digest = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION or \
+            cached_digest != digest:
+        return None
+    offset = HEADER.size
+    for action in spartanquest.Problem.moves:
+        if COST.unpack_from(data, offset) != \
+                (action.encode(), spartanquest.Problem.cost[action]):
+            return None  # the cost table changed
+        offset += COST.size
+    medal_cells = struct.unpack_from(f'<{medal_count}I', data, offset)
+    offset += 4 * medal_count
+    wall_size = (width * height + 7) // 8
+    walls = bytes(data[offset:offset + wall_size])
+    offset += wall_size
+    snapshot = spartanquest.Snapshot(
+        width=width, height=height, walls=walls, mascot_cell=mascot_cell,
+        medal_cells=medal_cells, compact=compact, macro=macro, prune=prune)
+    if not flags & TABLES:
+        return spartanquest.Problem.from_snapshot(snapshot)
+    move_masks = bytearray(data[offset:offset + width * height])
+    if len(move_masks) != width * height:
+        raise ValueError('The cache file is truncated')
+    offset += width * height
+    size, = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    to_medal = marshal.loads(data[offset:offset + size])
+    quest = spartanquest.Problem.from_snapshot(snapshot, move_masks)
+    quest.precomputed['medal_distances'] = \
+        distances.MedalDistances(quest, to_medal)
+    return quest
+
+
+def load_quest(quest_file, compact=False, macro=False, prune=False,
+               cache_file=None, tables=True):
+    """
+    Load the quest from its cache file, parsing the quest file and
+    writing the cache file first if it is missing or stale
+    :param
+    quest_file (string) name of the quest file
+    compact (Boolean) see the Problem class
+    macro (Boolean) see the Problem class
+    prune (Boolean) see the Problem class
+    cache_file (string) name of the cache file, None for the quest file
+            name followed by CACHE_SUFFIX
+    tables (Boolean) include the move masks and medal distance tables
+            when the cache file is written
+    :return: a Problem object
+    """
+    cache_file = cache_file or quest_file + CACHE_SUFFIX
+    digest = source_digest(quest_file)
+    quest = load(cache_file, digest, compact, macro, prune)
+    if quest is None:
+        with open(quest_file) as mazefile:
+            quest = spartanquest.Problem(mazefile, compact, macro, prune)
+        try:
+            save(quest, cache_file, digest, tables)
+        except OSError:
+            pass  # e.g. a read-only directory: solve without a cache
+    return quest
+
+
+def get_arguments():
+    '''
+    Parse and validate the command line arguments
+    :return: (argparse.Namespace) the parsed arguments
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('quest_files',
+                        help='quest files to cache',
+                        nargs='+')
+    parser.add_argument('--no-tables',
+                        help='leave the move masks and medal distance '
+                             'tables out of the cache',
+                        action='store_true')
+    return parser.parse_args()
+
+
+def main():
+    arguments = get_arguments()
+    for quest_file in arguments.quest_files:
+        with open(quest_file) as mazefile:
+            quest = spartanquest.Problem(mazefile)
+        cache_file = quest_file + CACHE_SUFFIX
+        save(quest, cache_file, source_digest(quest_file),
+             not arguments.no_tables)
+        print(f'{cache_file}: {os.path.getsize(cache_file):,} bytes')
+
+
+if __name__ == '__main__':
+    main()
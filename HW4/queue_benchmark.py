@@ -0,0 +1,149 @@
+# ----------------------------------------------------------------------
+# Name:     queue_benchmark
+# Purpose:  Measure the throughput of the breadth first search fringe
+# ----------------------------------------------------------------------
+"""
+Micro-benchmark of the breadth first search fringe
+
+Usage:  queue_benchmark.py [size ...]
+
+For each of the given sizes, times push and pop directly on
+data_structures.Queue and on the former list based queue, with the
+queue holding that many items, then runs breadth first search over an
+open square maze of that size (Sammy in the top left corner and a
+medal in each of the other three corners) with each queue as the
+fringe of search_stream.graph_search, the search loop of bfs.  The
+first table measures the queues alone, the second one the whole
+search.
+
+Example:  queue_benchmark.py 50 100 200
+"""
+import io
+import sys
+import time
+import data_structures
+import search_stream
+import spartanquest
+
+
+class ListQueue(data_structures.Queue):
+    """
+    The former queue implementation: O(n) push at the front of a list
+    """
+
+    def __init__(self):
+        self.list = []
+
+    def push(self, item):
+        """
+        Add the given item to the end of the queue
+        :param item: (of any type)
+        :return: None
+        """
+        self.list.insert(0, item)
+
+    def pop(self):
+        """
+        Remove the earliest pushed item from the queue and return it.
+        :return: item (of any type)
+        """
+        return self.list.pop()
+
+    def is_empty(self):
+        """
+        Is this queue empty?
+        :return: (Boolean) True if the queue is empty, False otherwise
+        """
+        return not self.list
+
+    def __len__(self):
+        """
+        How many items are in this queue?
+        :return: (int) the number of items in the queue
+        """
+        return len(self.list)
+
+
+# Number of push and pop pairs timed by queue_throughput
+QUEUE_OPERATIONS = 200000
+
+
+def open_maze(size):
+    """
+    Build the text of an open square maze without walls
+    :param size: (int) the width and height of the maze
+    :return: (string) the maze in the quest file format
+    """
+    rows = ['-' * size for y in range(size)]
+    rows[0] = 'S' + rows[0][1:-1] + 'M'
+    rows[-1] = 'M' + rows[-1][1:-1] + 'M'
+    return '\n'.join(rows)
+
+
+def queue_throughput(queue_class, size, operations=QUEUE_OPERATIONS):
+    """
+    Time push and pop on a queue holding the given number of items
+    Each pop is followed by a push, as in a search whose fringe keeps
+    the same size.
+    :param
+    queue_class: the class of the queue
+    size (int) the number of items in the queue while it is timed
+    operations (int) the number of push and pop pairs timed
+    :return: (tuple) the number of queue operations and the elapsed time
+    """
+    queue = queue_class()
+    for item in range(size):
+        queue.push(item)
+    start_time = time.perf_counter()
+    for item in range(operations):
+        queue.push(queue.pop())
+    return 2 * operations, time.perf_counter() - start_time
+
+
+def fringe_throughput(problem, queue_class):
+    """
+    Run breadth first search with the given fringe and time it
+    The search is the loop bfs runs, see search_stream.graph_search.
+    :param
+    problem (a Problem object) representing the quest
+    queue_class: the class used for the fringe
+    :return: (tuple) the number of nodes expanded, the elapsed time
+            and the largest fringe size in the progress snapshots
+    """
+    nodes_expanded = problem.nodes_expanded()
+    largest = 0
+    start_time = time.perf_counter()
+    for progress in search_stream.graph_search(
+            problem, queue_class(),
+            interval=search_stream.PROGRESS_INTERVAL):
+        largest = max(largest, progress.fringe_size)
+    return (problem.nodes_expanded() - nodes_expanded,
+            time.perf_counter() - start_time, largest)
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [50, 100, 200]
+    print('Queue operations')
+    print(f'{"size":>6} {"queue":>10} {"ops/sec":>12} {"time":>10}')
+    for size in sizes:
+        for queue_class in (ListQueue, data_structures.Queue):
+            operations, elapsed_time = queue_throughput(queue_class, size)
+            print(f'{size:>6} {queue_class.__name__:>10} '
+                  f'{operations / elapsed_time:>12,.0f} '
+                  f'{elapsed_time:>9.3f}s')
+    print('\nBreadth first search')
+    print(f'{"size":>6} {"fringe":>8} {"queue":>10} '
+          f'{"nodes/sec":>12} {"time":>10}')
+    for size in sizes:
+        problem = spartanquest.Problem(io.StringIO(open_maze(size)),
+                                       compact=True)
+        for queue_class in (ListQueue, data_structures.Queue):
+            nodes_expanded, elapsed_time, largest = \
+                fringe_throughput(problem, queue_class)
+            print(f'{size:>6} {largest:>8,} {queue_class.__name__:>10} '
+                  f'{nodes_expanded / elapsed_time:>12,.0f} '
+                  f'{elapsed_time:>9.3f}s')
+
+
+if __name__ == '__main__':
+    main()
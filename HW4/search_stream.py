@@ -0,0 +1,191 @@
+"""
+Generator based graph search that reports its progress
+
+graph_search is the graph search loop of dfs, bfs, ucs and astar (see
+uninformed_search.py and informed_search.py): the fringe passed in
+decides the order of the search.  It is a generator: it yields a
+Progress snapshot every few expansions and a final one with the
+solution.  The caller can stop the search at any point by not resuming
+the generator (or calling its close method), so a service wrapping a
+Problem can stream the progress to its clients and enforce a deadline
+without a thread stuck in the search loop:
+
+    for progress in stream_search(quest, 'astar', gen_heuristic):
+        send(progress)
+        if time.monotonic() > deadline:
+            break
+"""
+import collections
+import time
+import data_structures
+
+# Number of node expansions between two progress snapshots
+PROGRESS_INTERVAL = 1000
+
+Progress = collections.namedtuple(
+    'Progress', ['nodes_expanded', 'fringe_size', 'best_f', 'elapsed',
+                 'done', 'solution'])
+Progress.__doc__ = """
+Snapshot of a search in progress
+nodes_expanded (int): the number of nodes expanded so far
+fringe_size (int): the number of nodes in the fringe
+best_f (number): ucs and astar: the highest f value (cost plus
+    heuristic) taken from the fringe so far, a lower bound on the cost
+    of the solution with a consistent heuristic; None for dfs and bfs
+elapsed (float): seconds since the search started
+done (Boolean): True for the final snapshot
+solution (list): the list of actions of the solution in the final
+    snapshot, None otherwise or if there is no solution
+"""
+
+
+def graph_search(problem, fringe, priority=None, closed_backing='set',
+                 interval=None):
+    """
+    Graph search generator yielding progress snapshots
+    Nodes are taken from the fringe, goal tested, then expanded unless
+    their state was already explored.  No node is created for the
+    children whose state was already explored.
+    :param
+    problem (a Problem object) representing the quest
+            see Problem class definition in spartanquest.py
+    fringe (an empty Stack, Queue, PriorityQueue or IndexedPriorityQueue
+            object) an indexed priority queue holds each state at most
+            once
+    priority (a function) called with each child node, returns its
+            priority in a priority queue fringe (the root has priority
+            0) - None for a Stack or Queue fringe
+    closed_backing (string) 'set' or 'compact', see ClosedSet
+            - defaults to 'set'
+    interval (int) number of node expansions between two snapshots,
+            None for the final snapshot only - defaults to None
+    :return: generator of Progress tuples, the last one has done set
+    """
+    start_time = time.monotonic()
+    best_f = None
+    solution = None  # Failure -  unless a solution is found
+    closed = problem.closed_set(closed_backing)  # our explored states
+    state = problem.start_state()
+    _push(fringe, data_structures.Node(state, None, None),
+          None if priority is None else 0)
+    expansions = 0
+    while not fringe.is_empty():
+        node, f_value = fringe.pop()
+        if f_value is not None and (best_f is None or f_value > best_f):
+            best_f = f_value
+        if problem.is_goal(node.state):
+            solution = node.solution()  # we found a solution
+            break
+        if node.state in closed:
+            continue
+        closed.add(node.state)  # we are implementing graph search
+        for child_state, action, action_cost in problem.expand(node.state):
+            if child_state in closed:
+                continue  # no node for explored states
+            child_node = data_structures.Node(
+                child_state, node, action, node.cumulative_cost + action_cost)
+            _push(fringe, child_node,
+                  None if priority is None else priority(child_node))
+        expansions += 1
+        if interval and expansions % interval == 0:
+            yield Progress(problem.nodes_expanded(), len(fringe), best_f,
+                           time.monotonic() - start_time, False, None)
+    problem.record_closed_set(closed)
+    yield Progress(problem.nodes_expanded(), len(fringe), best_f,
+                   time.monotonic() - start_time, True, solution)
+
+
+def run(stream):
+    """
+    Run a search generator to the end
+    :param stream: generator of Progress tuples, e.g. from graph_search
+    :return: list of actions representing the solution to the quest
+            or None if there is no solution
+    """
+    progress = None
+    for progress in stream:
+        pass
+    return progress.solution
+
+
+def _push(fringe, node, f_value):
+    """
+    Push the node with its f value on the given fringe
+    This is a private function.
+    :param
+    fringe (Stack, Queue, PriorityQueue or IndexedPriorityQueue object)
+    node (a Node object)
+    f_value (number) the priority of the node, None for a Stack or Queue
+    :return: None
+    """
+    if isinstance(fringe, data_structures.IndexedPriorityQueue):
+        fringe.push_or_decrease(node.state, (node, f_value), f_value)
+    elif isinstance(fringe, data_structures.PriorityQueue):
+        fringe.push((node, f_value), f_value)
+    else:
+        fringe.push((node, None))
+
+
+def stream_search(problem, search, heuristic=None, interval=PROGRESS_INTERVAL,
+                  closed_backing='set'):
+    """
+    Graph search generator yielding progress snapshots every interval
+    expansions
+    :param
+    problem (a Problem object) representing the quest
+            see Problem class definition in spartanquest.py
+    search (string) 'dfs', 'bfs', 'ucs' or 'astar'
+    heuristic (a function) astar: the heuristic function to be used,
+            None for no heuristic
+    interval (int) number of node expansions between two snapshots
+    closed_backing (string) 'set' or 'compact', see ClosedSet
+    :return: generator of Progress tuples, the last one has done set
+    """
+    if search == 'dfs':
+        fringe = data_structures.Stack()
+    elif search == 'bfs':
+        fringe = data_structures.Queue()
+    elif search in ('ucs', 'astar'):
+        fringe = data_structures.PriorityQueue()
+    else:
+        raise ValueError(f'Unknown search algorithm: {search}')
+    priority = None
+    if search == 'ucs' or (search == 'astar' and heuristic is None):
+        priority = cumulative_cost
+    elif search == 'astar':
+        def priority(node):
+            return node.cumulative_cost + heuristic(node.state, problem)
+    return graph_search(problem, fringe, priority, closed_backing, interval)
+
+
+def cumulative_cost(node):
+    """
+    Return the cost from the root to the node, the priority of ucs
+    :param node: (a Node object)
+    :return: (number) the cumulative cost of the node
+    """
+    return node.cumulative_cost
+
+
+def search_with_deadline(problem, search, heuristic=None, time_limit=None,
+                         interval=PROGRESS_INTERVAL):
+    """
+    Run stream_search until it finishes or the time limit passes
+    The deadline is checked at every progress snapshot.
+    :param
+    problem (a Problem object) representing the quest
+    search (string) 'dfs', 'bfs', 'ucs' or 'astar'
+    heuristic (a function) astar: the heuristic function to be used,
+            None for no heuristic
+    time_limit (number) seconds allowed, None for no limit
+    interval (int) number of node expansions between two snapshots
+    :return: the last Progress tuple, its done field is False if the
+            search was stopped at the deadline
+    """
+    progress = None
+    stream = stream_search(problem, search, heuristic, interval)
+    for progress in stream:
+        if time_limit is not None and progress.elapsed > time_limit:
+            stream.close()
+            break
+    return progress
@@ -17,9 +17,20 @@ The search_algorithm in homework 3 is:
     ucs for uniform cost search
 The search_algorithm in homework 4 is:
     astar: for A*  search
+Additional search algorithms:
+    bidir: for bidirectional uniform cost search (single medal quests)
+    idastar: for iterative deepening A* search
+    arastar: for anytime repairing A* search (see --time-budget)
+    portfolio: run the searches in PORTFOLIO in parallel processes and
+               keep the first optimal solution (see --accept-suboptimal)
+    pbfs: breadth first search sharded across worker processes, same
+          solution as bfs (see parallel_search.py and --workers)
 
 Example:  spartanquest.py SJSU.txt dfs
 
+Use --no-display to skip the visualization, e.g. on a server without
+a display: tkinter is then never imported.
+
 The uninformed search algorithms functions are implemented in the file
 uninformed_search.py.
 
@@ -28,9 +39,103 @@ Your task for homework 4 is to implement astar in informed_search.py.
 """
 import time
 import argparse
+import bisect
+import collections
+import io
+import mmap
+import os
+import re
+import data_structures
 import uninformed_search
 import informed_search
-import graphics
+
+# The searches run by the portfolio search, as tuples
+# (search algorithm, heuristic, weight).  A weight of None runs the
+# algorithm with its default weight.
+PORTFOLIO = [('astar', 'mst_heuristic', None),
+             ('astar', 'gen_heuristic', None),
+             ('ucs', 'null_heuristic', None),
+             ('astar', 'mst_heuristic', 2),
+             ('bfs', 'null_heuristic', None)]
+
+# The searches guaranteed to find an optimal solution with the
+# heuristics in informed_search.py (astar only with a weight of 1)
+OPTIMAL_SEARCHES = {'astar', 'ucs', 'bidir', 'idastar'}
+
+# The searches returning the path with the fewest moves: a macro move
+# would count as one move, so they refuse quests with macro moves
+STEP_SEARCHES = {'bfs', 'pbfs'}
+
+# Translation tables between quest file characters and wall flags
+# (1 for W or w, 0 for anything else), from wall flags to vacancy flags
+# and between wall flags and the binary digits used to pack them (see
+# Problem.snapshot)
+WALL_TABLE = bytes(int(code in b'Ww') for code in range(256))
+VACANT_TABLE = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+DIGIT_TABLE = bytes.maketrans(b'\x00\x01', b'01')
+FLAG_TABLE = bytes.maketrans(b'01', b'\x00\x01')
+
+Snapshot = collections.namedtuple(
+    'Snapshot', ['width', 'height', 'walls', 'mascot_cell', 'medal_cells',
+                 'compact', 'macro', 'prune'])
+Snapshot.__doc__ = """
+Compact picklable description of a quest, see Problem.snapshot
+Use _replace to change the options, e.g. snapshot._replace(compact=True)
+width (int), height (int): the size of the maze
+walls (bytes): the wall flags packed 8 cells per byte, bit i is cell i
+mascot_cell (int): the flat index of Sammy's cell
+medal_cells (tuple of ints): the flat index of each medal's cell
+compact (Boolean), macro (Boolean), prune (Boolean): the options of
+    the quest, see the Problem class
+"""
+
+class MoveTable(object):
+    """
+    Represent the moves out of (or into) every cell of a maze, packed in
+    one bitmask per cell and listed on demand
+
+    Arguments:
+    masks (bytearray): indexed by flat cell index, bit i is set if the
+        step with bit i can be taken from (or into) that cell
+    steps (list of tuples): the steps as tuples (bit, offset, action,
+        cost), in the order the moves are listed.  The offset is added
+        to the flat index of a cell to get the cell at the other end of
+        the move.
+
+    Attributes:
+    masks (bytearray): the masks given, updated in place when a wall
+        is added or removed
+    choices (list of tuples): indexed by mask, the steps of the bits set
+        in that mask as tuples (offset, action, cost)
+    """
+    def __init__(self, masks, steps):
+        self.masks = masks
+        self.choices = [tuple((offset, action, cost)
+                              for bit, offset, action, cost in steps
+                              if mask >> bit & 1)
+                        for mask in range(1 << len(steps))]
+
+    def __getitem__(self, cell):
+        """
+        Return the moves of the given cell
+        :param cell: (int) flat index of the cell
+        :return: list of tuples (cell index, action, cost), the cell
+            index being the other end of the move
+        """
+        return [(cell + offset, action, cost)
+                for offset, action, cost in self.choices[self.masks[cell]]]
+
+    def __len__(self):
+        return len(self.masks)
+
+    def count(self, cell):
+        """
+        Return the number of moves of the given cell
+        :param cell: (int) flat index of the cell
+        :return: (int) the number of bits set in the mask of the cell
+        """
+        return len(self.choices[self.masks[cell]])
+
 
 class Maze(object):
     """
@@ -43,27 +148,210 @@ class Maze(object):
     Attributes:
     width (int):  the width of the maze
     height (int): the height of the maze
-    walls (two dimensional list of booleans):
-        Each element represents a position in the maze.
-        True indicates that there is a wall in that position.
-        False indicates the absence of a wall.
-        self.walls[x][y] indicates the presence or absence of a wall
-        at position (x, y) in the maze.
+    walls (bytearray): one byte per position in the maze, indexed by
+        flat cell index (see the cell method).
+        1 indicates that there is a wall in that position.
+        0 indicates the absence of a wall.
+    adjacency (MoveTable): the moves out of each cell, bit i of a mask
+        standing for the i-th move in moves; indexing it with a flat
+        cell index lists the moves as tuples
+        (neighbor cell index, action, cost).
+        None until build_adjacency is called.
+    reverse_adjacency (MoveTable): the moves into each cell; indexing
+        it lists the moves as tuples (predecessor cell index, action,
+        cost), where action is the move taken from the predecessor.
+        None until reverse_table is called.
+    segments (list of lists): indexed by flat cell index, each element
+        lists the corridors leaving that decision cell as tuples
+        (decision cell index, tuple of actions, total cost).
+        Empty until build_segments is called.
+    moves (dictionary), cost (dictionary): the moves and their costs
+        as given to build_adjacency, used to update the adjacency
+        tables when a wall is added or removed.
+        Not set until build_adjacency is called.
+    steps (list of tuples): the i-th move in moves as a tuple
+        (flat index offset, action, cost).
+        Not set until build_adjacency is called.
+    listeners (list of functions): called with the flat index of the
+        cell whenever a wall is added or removed (see add_listener)
+    pruning (tuple): the starting cell and the kept cells given to
+        prune_from, None if the maze was not pruned by prune_from
+    reached (bytearray): the cells reached by the flood fill of
+        prune_from, see flood_fill.  None until prune_from is called.
+    pruned (int): the number of vacant cells pruned by prune_from
     """
     def __init__(self, width, height):
-        self.walls = [[False for x in range(width)]
-                      for y in range(height)]
+        self.walls = bytearray(width * height)
         self.width = width
         self.height = height
+        self.adjacency = None
+        self.reverse_adjacency = None
+        self.segments = []
+        self.listeners = []
+        self.pruning = None
+        self.reached = None
+        self.pruned = 0
 
     def add_wall(self, position):
         """
         Add a wall in the specified position
+        If the adjacency tables are built, the moves into and out of
+        that position are removed and the listeners are notified.
         :param position: tuple(row, column) representing a maze position
         :return: None
         """
-        x, y = position
-        self.walls[y][x] = True
+        self._set_wall(position, 1)
+
+    def remove_wall(self, position):
+        """
+        Remove the wall in the specified position
+        If the adjacency tables are built, the moves into and out of
+        that position are added and the listeners are notified.
+        :param position: tuple(row, column) representing a maze position
+        :return: None
+        """
+        self._set_wall(position, 0)
+
+    def add_listener(self, listener):
+        """
+        Register a function to be called whenever a wall is added or
+        removed, once the adjacency tables are updated
+        If the maze was pruned by prune_from, it is pruned again and the
+        listener is also called with every other cell whose moves
+        changed.  The segments (see build_segments) are not updated.
+        :param listener: (function) called with the flat index of each
+            cell that changed, starting with the cell of the wall
+        :return: None
+        """
+        self.listeners.append(listener)
+
+    def _set_wall(self, position, wall):
+        """
+        Add (wall 1) or remove (wall 0) a wall - private method
+        :param
+        position - tuple(row, column) representing a maze position
+        wall - (int) 1 for a wall, 0 for a vacant position
+        :return: None
+        """
+        cell = self.cell(position)
+        if self.walls[cell] == wall:
+            return  # nothing changes
+        self.walls[cell] = wall
+        if self.adjacency is None:
+            return  # the tables are not built yet
+        if self.pruning is not None:
+            changed_cells = self._prune_again(cell)
+        else:
+            x, y = position
+            cells = [cell] + [self.cell((x + dx, y + dy))
+                              for dx, dy in self.moves.values()
+                              if self.within_bounds((x + dx, y + dy))]
+            for changed in cells:
+                self.adjacency.masks[changed] = self._move_mask(changed)
+            if self.reverse_adjacency is not None:
+                for changed in cells:
+                    self.reverse_adjacency.masks[changed] = \
+                        self._reverse_mask(changed)
+            changed_cells = [cell]
+        for changed in changed_cells:
+            for listener in self.listeners:
+                listener(changed)
+
+    def _prune_again(self, cell):
+        """
+        Rebuild the moves out of every cell from the walls and prune them
+        again from the cell given to prune_from, since a wall may open
+        or close a path anywhere in the maze - private method
+        The masks are updated in place, so the adjacency table stays the
+        same object.
+        :param cell: (int) flat index of the cell of the wall
+        :return: (list of int) the cell of the wall followed by the
+            other cells whose moves changed
+        """
+        masks = self.adjacency.masks
+        previous = int.from_bytes(masks, 'little')
+        masks[:] = self._move_masks()
+        source, keep = self.pruning
+        self.prune_from(source, keep)
+        changes = (previous ^ int.from_bytes(masks, 'little')).to_bytes(
+            len(masks), 'little')
+        return [cell] + [match.start()
+                         for match in re.finditer(rb'[^\x00]', changes)
+                         if match.start() != cell]
+
+    def _move_mask(self, cell):
+        """
+        Compute the mask of the moves out of one cell from the walls,
+        see adjacency - private method
+        :param cell: (int) flat index of the cell
+        :return: (int) the mask of the moves
+        """
+        if self.walls[cell]:
+            return 0  # Sammy never stands on a wall
+        y, x = divmod(cell, self.width)
+        mask = 0
+        for bit, (dx, dy) in enumerate(self.moves.values()):
+            new_position = (x + dx, y + dy)
+            if self.within_bounds(new_position) and \
+                    not self.is_wall(new_position):
+                mask |= 1 << bit
+        return mask
+
+    def _reverse_mask(self, cell):
+        """
+        Compute the mask of the moves into one cell from the masks of
+        the moves out of its neighbors, see reverse_adjacency - private
+        method
+        :param cell: (int) flat index of the cell
+        :return: (int) the mask of the moves
+        """
+        y, x = divmod(cell, self.width)
+        masks = self.adjacency.masks
+        mask = 0
+        for bit, (dx, dy) in enumerate(self.moves.values()):
+            position = (x - dx, y - dy)
+            if self.within_bounds(position) and \
+                    masks[self.cell(position)] >> bit & 1:
+                mask |= 1 << bit
+        return mask
+
+    def _move_masks(self):
+        """
+        Compute the masks of the moves out of every cell from the walls
+        The whole maze is handled at once as a big integer holding one
+        byte per cell: the vacancy of the cells one step away in each
+        direction is lined up with the cells by shifting that integer.
+        This is a private method.
+        :return: (bytearray) the masks, see adjacency
+        """
+        cells = len(self.walls)
+        vacant = int.from_bytes(self.walls.translate(VACANT_TABLE), 'little')
+        masks = 0
+        for bit, (dx, dy) in enumerate(self.moves.values()):
+            moves = vacant & _shift_cells(vacant, -(dy * self.width + dx),
+                                          cells)
+            if dx:  # the step must not wrap around to another row
+                columns = bytes(int(0 <= x + dx < self.width)
+                                for x in range(self.width))
+                moves &= int.from_bytes(columns * self.height, 'little')
+            masks |= moves << bit
+        return bytearray(masks.to_bytes(cells, 'little'))
+
+    def _reverse_masks(self):
+        """
+        Compute the masks of the moves into every cell from the masks of
+        the moves out of every cell, the same way as _move_masks
+        This is a private method.
+        :return: (bytearray) the masks, see reverse_adjacency
+        """
+        cells = len(self.walls)
+        masks = int.from_bytes(self.adjacency.masks, 'little')
+        ones = int.from_bytes(b'\x01' * cells, 'little')
+        reverse_masks = 0
+        for bit, (offset, action, action_cost) in enumerate(self.steps):
+            moves = masks >> bit & ones  # the cells the step is taken from
+            reverse_masks |= _shift_cells(moves, offset, cells) << bit
+        return bytearray(reverse_masks.to_bytes(cells, 'little'))
 
     def is_wall(self, position):
         """
@@ -73,7 +361,7 @@ class Maze(object):
         False otherwise
         """
         x, y = position
-        return self.walls[y][x]
+        return self.walls[y * self.width + x] == 1
 
     def within_bounds(self, position):
         """
@@ -85,6 +373,200 @@ class Maze(object):
         x, y = position
         return (0 <= x <= self.width -1) and (0 <= y <= self.height - 1)
 
+    def cell(self, position):
+        """
+        Return the flat index of the given position in the maze
+        :param position: tuple (x, y) representing a maze position
+        :return: (int) y * width + x
+        """
+        x, y = position
+        return y * self.width + x
+
+    def position(self, cell):
+        """
+        Return the maze position corresponding to the given flat index
+        :param cell: (int) flat index as returned by the cell method
+        :return: tuple (x, y) representing a maze position
+        """
+        y, x = divmod(cell, self.width)
+        return x, y
+
+    def build_adjacency(self, moves, cost, masks=None):
+        """
+        Precompute the valid moves out of every cell so that expanding
+        a state becomes a table lookup
+        :param
+        moves (dictionary) maps each action to its (dx, dy) offset
+        cost (dictionary) maps each action to its cost
+        masks (bytearray) the masks of the moves out of every cell if
+            they are known, e.g. loaded from a quest cache - computed
+            from the walls if None
+        :return: None
+        """
+        self.moves = moves
+        self.cost = cost
+        self.steps = [(dy * self.width + dx, action, cost[action])
+                      for action, (dx, dy) in moves.items()]
+        if masks is None:
+            masks = self._move_masks()
+        self.adjacency = MoveTable(
+            masks, [(bit, offset, action, action_cost) for bit,
+                    (offset, action, action_cost) in enumerate(self.steps)])
+        self.reverse_adjacency = None
+
+    def reverse_table(self):
+        """
+        Return the moves into every cell, building the table on first
+        use: only the searches following moves backwards need it
+        build_adjacency must be called first.
+        :return: (MoveTable) see reverse_adjacency
+        """
+        if self.reverse_adjacency is None:
+            masks = self._reverse_masks()
+            # list the predecessors in increasing cell index order
+            steps = sorted((-offset, bit, action, action_cost) for bit,
+                           (offset, action, action_cost)
+                           in enumerate(self.steps))
+            self.reverse_adjacency = MoveTable(
+                masks, [(bit, offset, action, action_cost)
+                        for offset, bit, action, action_cost in steps])
+        return self.reverse_adjacency
+
+    def build_segments(self, stops):
+        """
+        Precompute the corridors between decision cells so that a search
+        can cross a whole corridor in one macro move.
+        A decision cell is a vacant cell that does not have exactly two
+        vacant neighbors (a junction, a dead end or an open area cell),
+        or any of the given stop cells.  A corridor is the chain of
+        other cells between two decision cells.
+        build_adjacency must be called first.
+        :param stops: (set of int) cells that must be decision cells,
+            e.g. the medals and Sammy's starting cell
+        :return: None
+        """
+        adjacency = self.adjacency
+
+        def is_decision(cell):
+            return adjacency.count(cell) != 2 or cell in stops
+
+        self.segments = [[] for cell in range(len(self.walls))]
+        for cell in range(len(self.walls)):
+            if not adjacency.masks[cell] or not is_decision(cell):
+                continue
+            for new_cell, action, action_cost in adjacency[cell]:
+                previous, actions, total = cell, [action], action_cost
+                while not is_decision(new_cell):  # follow the corridor
+                    for next_cell, action, action_cost in \
+                            adjacency[new_cell]:
+                        if next_cell != previous:
+                            break
+                    previous = new_cell
+                    new_cell = next_cell
+                    actions.append(action)
+                    total += action_cost
+                if new_cell != cell:  # a loop back is never worth taking
+                    self.segments[cell].append((new_cell, tuple(actions),
+                                                total))
+
+    def flood_fill(self, source):
+        """
+        Find the cells Sammy can reach from the given cell
+        build_adjacency must be called first.
+        :param source: (int) flat index of the starting cell
+        :return: (bytearray) indexed by flat cell index, 1 if the cell
+            can be reached from the source, 0 otherwise
+        """
+        masks = self.adjacency.masks
+        choices = self.adjacency.choices
+        reached = bytearray(len(masks))
+        reached[source] = 1
+        stack = [source]
+        while stack:
+            cell = stack.pop()
+            for offset, action, action_cost in choices[masks[cell]]:
+                new_cell = cell + offset
+                if not reached[new_cell]:
+                    reached[new_cell] = 1
+                    stack.append(new_cell)
+        return reached
+
+    def prune(self, reached, keep):
+        """
+        Remove from the adjacency tables the cells that are not reached
+        and the dead ends: a cell with a single neighbor can only be
+        left the way it was entered, so it is never worth visiting
+        unless it must be (a kept cell).  Removing a dead end may turn
+        its neighbor into a dead end, so whole dead end corridors are
+        removed.
+        Sammy's moves are reversible, so a cell and its neighbors are
+        neighbors of each other.
+        build_adjacency must be called first and build_segments after.
+        :param
+        reached (bytearray) the cells to keep the moves of, see
+            flood_fill
+        keep (set of int) cells that must not be pruned, e.g. the medals
+            and Sammy's starting cell
+        :return: (int) the number of vacant cells pruned
+        """
+        masks = self.adjacency.masks
+        count = self.adjacency.count
+        bits = {move: bit for bit, move in enumerate(self.moves.values())}
+        opposite = [bits[-dx, -dy] for dx, dy in self.moves.values()]
+        pruned = 0
+        for cell in range(len(masks)):
+            if not reached[cell] and not self.walls[cell]:
+                masks[cell] = 0  # no move leads here from Sammy
+                pruned += 1
+        dead_ends = [cell for cell in range(len(masks))
+                     if count(cell) == 1 and cell not in keep]
+        while dead_ends:
+            cell = dead_ends.pop()
+            if count(cell) != 1:
+                continue  # already pruned
+            bit = masks[cell].bit_length() - 1  # the only move left
+            neighbor = cell + self.steps[bit][0]
+            masks[neighbor] &= ~(1 << opposite[bit])
+            masks[cell] = 0
+            pruned += 1
+            if count(neighbor) == 1 and neighbor not in keep:
+                dead_ends.append(neighbor)
+        self.reverse_adjacency = None  # rebuilt from the pruned moves
+        return pruned
+
+    def prune_from(self, source, keep):
+        """
+        Flood fill the maze from the given cell, then prune the cells
+        that are not reached and the dead ends (see flood_fill and prune)
+        The maze is pruned again whenever a wall is added or removed.
+        build_adjacency must be called first.
+        :param
+        source (int) flat index of the starting cell
+        keep (set of int) cells that must not be pruned, see prune
+        :return: (int) the number of vacant cells pruned
+        """
+        self.pruning = (source, keep)
+        self.reached = self.flood_fill(source)
+        self.pruned = self.prune(self.reached, keep)
+        return self.pruned
+
+
+def _shift_cells(packed, offset, cells):
+    """
+    Move every byte of an integer holding one byte per cell (see
+    Maze._move_masks) by the given number of cells, dropping the bytes
+    moved out of the maze - private function
+    :param
+    packed (int) the bytes of the cells, cell 0 in the lowest byte
+    offset (int) the number of cells to move the bytes up by, negative
+            to move them down
+    cells (int) the number of cells in the maze
+    :return: (int) the moved bytes
+    """
+    if offset < 0:
+        return packed >> -8 * offset
+    return packed << 8 * offset & (1 << 8 * cells) - 1
+
 
 class Problem(object):
     """
@@ -92,6 +574,13 @@ class Problem(object):
 
     Arguments:
     mazefile (file): text file containing the maze info
+    compact (Boolean): if True, states are represented compactly by two
+        integers (see start_state) - defaults to False
+    macro (Boolean): if True, expand crosses whole corridors in a single
+        macro move whose action is a tuple of actions - defaults to False
+    prune (Boolean): if True, the cells Sammy cannot reach and the dead
+        ends without a medal are removed from the maze adjacency tables
+        before the search (see prune_maze) - defaults to False
 
     Attributes:
     maze (Maze object):  the maze for this quest
@@ -99,6 +588,23 @@ class Problem(object):
     mascot_position (tuple of integers): the current position of Sammy
     medals (a set of tuples): a set containing the positions of the
     remaining medals in the quest
+    compact (Boolean): True if states are (cell, medal bitmask) pairs
+    macro (Boolean): True if expand crosses corridors in macro moves
+    prune (Boolean): True if the maze is pruned before the search
+    unreachable_medals (list of tuples): the positions of the medals
+    Sammy cannot reach, found whenever the maze is pruned - the quest fails
+    if there are any
+    medal_list (list of tuples): the positions of all the medals in the
+    quest, the medal at index i is represented by bit i in compact states
+    medal_bits (dictionary): maps the flat index of each medal cell to
+    the bit representing that medal in compact states
+    precomputed (dictionary): tables derived from the maze by
+    preprocessing steps (see distances.py), keyed by name
+    statistics (dictionary): counters recorded by the search algorithms,
+    keyed by description
+    measure_closed_set (Boolean): if True, the searches also record the
+    memory used by their closed set, which takes a pass over the closed
+    states (see record_closed_set) - False unless set by the caller
     """
     NORTH = "N"
     SOUTH = "S"
@@ -109,10 +615,29 @@ class Problem(object):
     # The cost (number of carrots consumed) associated with each move.
     cost = {EAST: 15, WEST: 1, SOUTH: 2, NORTH: 14}
 
-    def __init__(self, mazefile):
+    def __init__(self, mazefile, compact=False, macro=False, prune=False):
+        self._initialize(compact, macro, prune)
+        self.read_quest(mazefile)
+
+    def _initialize(self, compact, macro, prune):
+        """
+        Set the options and the empty state of a new quest, before its
+        maze is read (see __init__ and from_snapshot) - private method
+        :param
+        compact (Boolean) see the Problem class
+        macro (Boolean) see the Problem class
+        prune (Boolean) see the Problem class
+        :return: None
+        """
         self._nodes_expanded = 0 # private variable
         self.medals = set()
-        self.read_quest(mazefile)
+        self.compact = compact
+        self.macro = macro
+        self.prune = prune
+        self.unreachable_medals = []
+        self.precomputed = {}
+        self.statistics = {}
+        self.measure_closed_set = False
 
     def read_quest(self, mazefile):
         """
@@ -126,27 +651,172 @@ class Problem(object):
         M or m: represent the presence of a medal at that position
         S or s: represent the starting position of our mascot Sammy
         Any other character: a vacant maze position
+        Characters past the width of the maze are ignored.
+        The file is memory-mapped when possible and scanned a row at a
+        time, the medals and Sammy are located with regular expression
+        searches over the whole file.
         :param
         mazefile (file object): the file object containing the maze info
         :return: None
         """
-        layout = mazefile.readlines()
-        width = len(layout[0].strip()) # the first line
-        height = len(layout) # the number of lines represents the height
-        self.maze = Maze(width, height)
-        y = 0
-        for line in layout:
-            x = 0
-            for char in line:
-                if char in {'W', 'w'}: # W represents a wall
-                    self.maze.add_wall((x, y))
-                elif char in {'M', 'm'}: # M represents a medal position
-                    self.add_medal((x, y))
-                elif char in {'S', 's'}: # S represents Sammy's position
-                    self.add_mascot((x, y))
-                x += 1 # anything else is a vacant maze position
-            y += 1
-        mazefile.close()
+        layout = read_layout(mazefile)
+        try:
+            self.parse_layout(layout)
+        finally:
+            if isinstance(layout, mmap.mmap):
+                layout.close()
+            mazefile.close()
+        self.preprocess()
+
+    def parse_layout(self, layout):
+        """
+        Build the maze, the medals and Sammy's position from the
+        contents of a quest file (see read_quest)
+        :param layout: (bytes-like object) the contents of the file
+        :return: None
+        """
+        size = len(layout)
+        line_starts = []
+        start = 0
+        while start < size:  # the number of lines represents the height
+            line_starts.append(start)
+            end = layout.find(b'\n', start)
+            start = size if end < 0 else end + 1
+        if not line_starts:
+            raise ValueError('The quest file is empty')
+        line_ends = [start - 1 for start in line_starts[1:]] + [size]
+        width = len(layout[:line_ends[0]].strip())  # the first line
+        self.maze = Maze(width, len(line_starts))
+        walls = self.maze.walls
+        for y, start in enumerate(line_starts):
+            row = layout[start:min(start + width, line_ends[y])]
+            walls[y * width:y * width + len(row)] = row.translate(WALL_TABLE)
+
+        def positions(pattern):  # positions of the matching characters
+            for match in re.finditer(pattern, layout):
+                y = bisect.bisect_right(line_starts, match.start()) - 1
+                x = match.start() - line_starts[y]
+                if x < width:
+                    yield x, y
+
+        for position in positions(rb'[Mm]'):  # M represents a medal
+            self.add_medal(position)
+        for position in positions(rb'[Ss]'):  # S represents Sammy
+            self.add_mascot(position)
+
+    def preprocess(self):
+        """
+        Build the tables derived from the maze, the medals and Sammy's
+        position once the quest has been read
+        The adjacency table is kept if it is already there, e.g.
+        loaded from a quest cache (see quest_cache.py).
+        :return: None
+        """
+        if self.maze.adjacency is None:
+            self.maze.build_adjacency(self.moves, self.cost)
+        self.maze.add_listener(self._maze_changed)
+        self.index_medals()
+        if self.prune:
+            self.prune_maze()
+        if self.macro:
+            self.maze.build_segments(
+                set(self.medal_bits) | {self.maze.cell(self.mascot_position)})
+
+    def _maze_changed(self, cell):
+        """
+        Forget the tables derived from the walls when a wall is added or
+        removed (see Maze.add_listener), and find the unreachable medals
+        again if the maze is pruned - private method
+        :param cell: (int) flat index of the cell that changed
+        :return: None
+        """
+        self.precomputed.clear()
+        if self.prune:  # the maze was pruned again, see Maze.prune_from
+            self._record_pruning()
+
+    def prune_maze(self):
+        """
+        Flood fill the maze from Sammy's cell to find the medals Sammy
+        cannot reach, then prune the cells that are not reached and the
+        dead ends without a medal (see Maze.prune_from)
+        The maze is pruned again whenever a wall is added or removed.
+        The number of cells pruned and of unreachable medals are recorded
+        in the statistics.
+        :return: None
+        """
+        start = self.maze.cell(self.mascot_position)
+        self.maze.prune_from(start, set(self.medal_bits) | {start})
+        self._record_pruning()
+
+    def _record_pruning(self):
+        """
+        Find the medals the last pruning of the maze did not reach and
+        record the statistics of the pruning - private method
+        :return: None
+        """
+        reached = self.maze.reached
+        self.unreachable_medals = [medal for medal in self.medal_list
+                                   if not reached[self.maze.cell(medal)]]
+        self.statistics['Cells pruned'] = self.maze.pruned
+        self.statistics['Unreachable medals'] = len(self.unreachable_medals)
+
+    def snapshot(self):
+        """
+        Return a compact picklable description of the quest, e.g. to
+        send it to another process (see from_snapshot)
+        The walls are packed 8 cells per byte, the derived tables are
+        left out and rebuilt by from_snapshot.
+        :return: (Snapshot) the maze, Sammy's cell, the medal cells and
+                the options of the quest
+        """
+        maze = self.maze
+        digits = maze.walls[::-1].translate(DIGIT_TABLE) or b'0'
+        walls = int(digits, 2).to_bytes((len(maze.walls) + 7) // 8,
+                                        'little')  # bit i is cell i
+        return Snapshot(maze.width, maze.height, walls,
+                        maze.cell(self.mascot_position),
+                        tuple(maze.cell(medal) for medal in self.medal_list),
+                        self.compact, self.macro, self.prune)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, move_masks=None):
+        """
+        Rebuild a quest from the description returned by snapshot
+        :param
+        snapshot (Snapshot) as returned by the snapshot method, or a
+                tuple of its fields
+        move_masks (bytearray) the masks of the moves out of every cell
+                if they are known, None to build them (see
+                Maze.build_adjacency)
+        :return: a new Problem object, with no nodes expanded yet
+        """
+        snapshot = Snapshot(*snapshot)
+        quest = cls.__new__(cls)
+        quest._initialize(snapshot.compact, snapshot.macro, snapshot.prune)
+        quest.maze = Maze(snapshot.width, snapshot.height)
+        cells = snapshot.width * snapshot.height
+        if cells:
+            digits = format(int.from_bytes(snapshot.walls, 'little'),
+                            f'0{cells}b')
+            quest.maze.walls[:] = digits.encode()[::-1].translate(FLAG_TABLE)
+        for cell in snapshot.medal_cells:
+            quest.add_medal(quest.maze.position(cell))
+        quest.add_mascot(quest.maze.position(snapshot.mascot_cell))
+        if move_masks is not None:
+            quest.maze.build_adjacency(cls.moves, cls.cost, move_masks)
+        quest.preprocess()
+        return quest
+
+    def index_medals(self):
+        """
+        Assign a bit to each medal so that the remaining medals can be
+        represented by a single integer bitmask in compact states
+        :return: None
+        """
+        self.medal_list = sorted(self.medals)
+        self.medal_bits = {self.maze.cell(medal): 1 << index
+                           for index, medal in enumerate(self.medal_list)}
+        self._medal_masks = {}  # medal mask of each tuple of medals seen
 
 
     def add_mascot(self, position):
@@ -174,6 +844,8 @@ class Problem(object):
         state - A state is represented by a tuple containing two tuples:
                 the current position (x, y) of Sammy the Spartan
                 a tuple containing the positions of the remaining medals
+                In compact mode, the tuple contains two integers instead
+                (see start_state)
 
         :return: Boolean - True if this is a goal state, False otherwise
         """
@@ -193,9 +865,51 @@ class Problem(object):
         state - The start state in the quest
                 A state is represented by a tuple containing two tuples:
                 the current position (row, column) of Sammy the Spartan
+                a tuple containing the positions of the remaining medals,
+                sorted so that equal states are equal tuples
+                In compact mode, the state is a tuple of two integers:
+                the flat index of Sammy's cell (see Maze.cell)
+                a bitmask with bit i set if medal_list[i] remains
+        """
+        if self.compact:
+            return (self.maze.cell(self.mascot_position),
+                    (1 << len(self.medal_list)) - 1)
+        return self.mascot_position, tuple(self.medal_list)
+
+    def decode_state(self, state):
+        """
+        Return the given state in its tuple representation
+        :param
+        state - A state in either representation (see start_state)
+        :return:
+        tuple containing two tuples:
+                the current position (x, y) of Sammy the Spartan
                 a tuple containing the positions of the remaining medals
         """
-        return self.mascot_position, tuple(self.medals)
+        if not self.compact:
+            return state
+        cell, medal_mask = state
+        medals = tuple(medal for index, medal in enumerate(self.medal_list)
+                       if medal_mask >> index & 1)
+        return self.maze.position(cell), medals
+
+    def encode_state(self, state):
+        """
+        Return the given state in its compact representation
+        :param
+        state - A state in either representation (see start_state)
+        :return:
+        tuple containing two integers:
+                the flat index of Sammy's cell (see Maze.cell)
+                a bitmask with bit i set if medal_list[i] remains
+        """
+        if self.compact:
+            return state
+        position, medals = state
+        medal_mask = 0
+        for medal in medals:
+            medal_mask |= self.medal_bits[self.maze.cell(medal)]
+        return self.maze.cell(position), medal_mask
 
     def expand(self, state):
         """
@@ -204,26 +918,124 @@ class Problem(object):
         :param
         state - A state is represented by a tuple containing two other tuples:
                 the current position (x, y) of Sammy the Spartan
-                a tuple containing the positions of the remaining medals
+                a tuple containing the positions of the remaining medals,
+                in sorted order (see start_state)
         :return:
         a list of tuples representing all states that are reachable
         from the current state with their corresponding action and cost
+        In macro mode, the action is a tuple of the actions crossing a
+        corridor and the cost is their total cost.
         """
         result = []
         self._nodes_expanded += 1 # update private variable
+        if self.compact:
+            return self._expand_compact(state, result)
         position, current_medals = state
-        current_x, current_y = position
-        for action in self.moves:
-            new_position = (current_x + self.moves[action][0],
-                            current_y + self.moves[action][1])
-            # if the move in that direction is valid
-            if self.maze.within_bounds(new_position) and \
-                not self.maze.is_wall(new_position):
-                new_medals = set(current_medals) - {new_position}
-                new_state = (new_position, tuple(new_medals))
-                result.append((new_state, action, self.cost[action]))
+        cell = self.maze.cell(position)
+        if self.macro:  # the segments list the cells they lead to
+            origin, transitions = 0, self.maze.segments[cell]
+        else:  # the steps of the adjacency table, see _expand_compact
+            adjacency = self.maze.adjacency
+            origin = cell
+            transitions = adjacency.choices[adjacency.masks[cell]]
+        width = self.maze.width
+        for step, action, action_cost in transitions:
+            y, x = divmod(origin + step, width)
+            new_position = (x, y)
+            if new_position in current_medals:  # keep the medals sorted
+                new_medals = tuple(medal for medal in current_medals
+                                   if medal != new_position)
+            else:
+                new_medals = current_medals
+            new_state = (new_position, new_medals)
+            result.append((new_state, action, action_cost))
+        return result
+
+    def _expand_compact(self, state, result):
+        """
+        Compact mode counterpart of expand - private method
+        The steps of the adjacency table are followed directly rather
+        than through the lists it builds, see Maze.adjacency.
+        :param
+        state - A compact state (see start_state)
+        result - the list to which the reachable states are appended
+        :return: the result list
+        """
+        cell, medal_mask = state
+        medal_bits = self.medal_bits
+        if self.macro:
+            for new_cell, action, action_cost in self.maze.segments[cell]:
+                new_state = (new_cell,
+                             medal_mask & ~medal_bits.get(new_cell, 0))
+                result.append((new_state, action, action_cost))
+            return result
+        adjacency = self.maze.adjacency
+        for offset, action, action_cost in \
+                adjacency.choices[adjacency.masks[cell]]:
+            new_cell = cell + offset
+            new_state = (new_cell, medal_mask & ~medal_bits.get(new_cell, 0))
+            result.append((new_state, action, action_cost))
         return result
 
+    def state_key(self, state):
+        """
+        Return a distinct non-negative integer for the given state,
+        equal for the same state in either representation
+        :param
+        state - A state in either representation (see start_state)
+        :return: (int) the flat index of Sammy's cell followed by the
+                bits of the remaining medals
+        """
+        if self.compact:
+            cell, medal_mask = state
+        else:
+            position, medals = state
+            cell = self.maze.cell(position)
+            medal_mask = self._medal_masks.get(medals)
+            if medal_mask is None:
+                medal_mask = self.encode_state(state)[1]
+                self._medal_masks[medals] = medal_mask
+        return cell << len(self.medal_list) | medal_mask
+
+    def closed_set(self, backing='set'):
+        """
+        Return an empty set of explored states for a search on this quest
+        :param backing: (string) 'set' or 'compact', see ClosedSet
+        :return: a ClosedSet object
+        """
+        if backing == 'compact' and \
+                len(self.maze.walls) << len(self.medal_list) >= 1 << 63:
+            raise ValueError('Too many medals for a compact closed set')
+        return data_structures.ClosedSet(backing, self.state_key)
+
+    def record_closed_set(self, closed):
+        """
+        Record the size of the closed set of a search in the statistics,
+        and its memory if measure_closed_set is set
+        :param closed: a ClosedSet object
+        :return: None
+        """
+        self.statistics['Closed set states'] = len(closed)
+        if self.measure_closed_set:
+            self.statistics['Closed set memory (bytes)'] = closed.memory()
+
+    def expand_cell(self, cell, reverse=False):
+        """
+        Return the moves out of (or into) the given cell, ignoring medals
+        Used by searches over Sammy's position alone, such as the
+        bidirectional search for single medal quests.
+        :param
+        cell (int) - flat index of a maze cell (see Maze.cell)
+        reverse (Boolean) - if True, return the moves into the cell
+        :return:
+        a list of tuples (cell, action, cost), see Maze.adjacency and
+        Maze.reverse_adjacency
+        """
+        self._nodes_expanded += 1 # update private variable
+        if reverse:
+            return self.maze.reverse_table()[cell]
+        return self.maze.adjacency[cell]
+
 
     def path_cost(self, actions):
         """
@@ -238,53 +1050,393 @@ class Problem(object):
         return self._nodes_expanded
 
 
+def read_layout(mazefile):
+    """
+    Return the contents of a quest file, memory-mapped if possible
+    :param mazefile: (file object) the file object containing the maze
+    :return: (mmap or bytes) the contents of the file
+    """
+    try:
+        fileno = mazefile.fileno()
+    except (AttributeError, io.UnsupportedOperation):  # e.g. a StringIO
+        return mazefile.read().encode()
+    if os.fstat(fileno).st_size == 0:
+        return b''  # an empty file cannot be memory-mapped
+    return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+
+def solve(quest, search, heuristic='null_heuristic', indexed=False,
+          cache_size=informed_search.HEURISTIC_CACHE_SIZE,
+          table_size=informed_search.TRANSPOSITION_TABLE_SIZE,
+          weight=None, time_budget=None, report=None, closed_backing='set',
+          **options):
+    """
+    Invoke the search algorithm specified on the given quest
+    The searches in STEP_SEARCHES raise ValueError on a quest with macro
+    moves: they return the path with the fewest moves.
+    :param
+    quest (a Problem object) representing the quest
+    search (string) name of the search algorithm, e.g. 'astar'
+    heuristic (string) name of the A* heuristic in informed_search.py
+    indexed (Boolean) astar and ucs: use an indexed priority queue
+    cache_size (int) astar: number of heuristic values to cache
+    table_size (int) idastar: size of the transposition table
+    weight (number) astar and arastar: (initial) weight of the heuristic,
+            at least 1, None for the algorithm's default
+    time_budget (number) arastar: seconds allowed, None for no limit;
+            TimeoutError is raised if no solution is found in time
+    report (a function) arastar: called with the cost and suboptimality
+            bound of each solution found
+    closed_backing (string) dfs, bfs, ucs and astar: 'set' or 'compact',
+            see ClosedSet
+    options: portfolio and pbfs: keyword arguments for the portfolio
+            and pbfs functions
+    :return: list of actions representing the solution to the quest
+            or None if there is no solution
+    """
+    if quest.macro and search in STEP_SEARCHES:
+        raise ValueError(f'{search} finds the fewest moves and cannot '
+                         f'count macro moves, solve without macro moves')
+    if weight is not None and weight < 1:
+        raise ValueError(f'The heuristic weight must be at least 1, '
+                         f'not {weight}')
+    if quest.unreachable_medals:
+        return None  # the quest fails without searching, see prune_maze
+    if search == "portfolio":
+        return portfolio(quest, **options)
+    if search == "pbfs":
+        import parallel_search  # only pbfs needs shared memory
+        return parallel_search.pbfs(quest, **options)
+    if search == "astar":
+        heuristic_function = getattr(informed_search, heuristic)
+        search_function = getattr(informed_search, search)
+        return search_function(quest, heuristic_function, indexed=indexed,
+                               cache_size=cache_size,
+                               weight=1 if weight is None else weight,
+                               closed_backing=closed_backing)
+    if search == "arastar":
+        heuristic_function = getattr(informed_search, heuristic)
+        search_function = getattr(informed_search, search)
+        if weight is None:
+            weight = informed_search.ANYTIME_WEIGHT
+        solution = None
+        for solution, cost, bound in search_function(
+                quest, heuristic_function, weight=weight,
+                time_budget=time_budget):
+            if report is not None:
+                report(cost, bound)
+        return solution
+    if search == "idastar":
+        heuristic_function = getattr(informed_search, heuristic)
+        search_function = getattr(informed_search, search)
+        return search_function(quest, heuristic_function,
+                               table_size=table_size)
+    search_function = getattr(uninformed_search, search)
+    if search == "ucs":
+        return search_function(quest, indexed=indexed,
+                               closed_backing=closed_backing)
+    if search in ("dfs", "bfs"):
+        return search_function(quest, closed_backing=closed_backing)
+    return search_function(quest)  # Invoke the search algorithm
+
+def portfolio(quest, strategies=PORTFOLIO, accept_suboptimal=False,
+              workers=None):
+    """
+    Run several searches on the quest in parallel processes and return
+    the first optimal solution found (or the first solution found if
+    suboptimal solutions are acceptable).  The searches still running
+    are then stopped.
+    Only the quest snapshot is sent to the worker processes.
+    If no optimal search succeeds, the cheapest solution found is
+    returned.
+    With macro moves, the searches in STEP_SEARCHES are left out.
+    :param
+    quest (a Problem object) representing the quest
+    strategies (list of tuples) the searches to run, as tuples
+            (search algorithm, heuristic, weight) - see PORTFOLIO
+    accept_suboptimal (Boolean) return the first solution found even if
+            the search that found it is not guaranteed to be optimal
+    workers (int) number of worker processes, None for one per search
+    :return: list of actions representing the solution to the quest
+            or None if there is no solution
+    """
+    import multiprocessing  # only the portfolio starts processes here
+    if quest.macro:
+        strategies = [strategy for strategy in strategies
+                      if strategy[0] not in STEP_SEARCHES]
+    snapshot = quest.snapshot()
+    best = None
+    pool = multiprocessing.Pool(workers or len(strategies))
+    try:
+        tasks = [(snapshot, strategy) for strategy in strategies]
+        for strategy, solution, nodes_expanded in \
+                pool.imap_unordered(_run_strategy, tasks):
+            search, heuristic, weight = strategy
+            quest.statistics['Nodes expanded by the portfolio'] = \
+                quest.statistics.get('Nodes expanded by the portfolio',
+                                     0) + nodes_expanded
+            if solution is None:
+                if search in OPTIMAL_SEARCHES and weight in (None, 1):
+                    break  # an optimal search proved there is no solution
+                continue
+            if best is None or \
+                    quest.path_cost(solution) < quest.path_cost(best):
+                best = solution
+            if accept_suboptimal or \
+                    (search in OPTIMAL_SEARCHES and weight in (None, 1)):
+                break
+    finally:
+        pool.terminate()  # stop the searches still running or queued
+        pool.join()
+    return best
+
+def _run_strategy(task):
+    """
+    Solve the quest described by the snapshot in a worker process
+    This is a private function.
+    :param task: (tuple) the snapshot of the quest (see Problem.snapshot)
+            and the strategy, a tuple (search algorithm, heuristic,
+            weight) - see PORTFOLIO
+    :return: (tuple) the strategy, the solution or None, the number of
+            nodes expanded
+    """
+    snapshot, strategy = task
+    search, heuristic, weight = strategy
+    quest = Problem.from_snapshot(snapshot)
+    solution = solve(quest, search, heuristic, weight=weight)
+    return strategy, solution, quest.nodes_expanded()
+
+def load_and_solve(quest_file, search, heuristic, options,
+                   measure_closed_set=False):
+    """
+    Parse the quest file and solve it with the given search options
+    :param
+    quest_file (string) name of the quest file
+    search (string) name of the search algorithm, e.g. 'astar'
+    heuristic (string) name of the A* heuristic in informed_search.py
+    options (dictionary) the compact, macro, prune and indexed options,
+            see search_options
+    measure_closed_set (Boolean) record the memory of the closed set,
+            see the Problem class
+    :return: (tuple) the Problem object, the solution or None, the
+            parse time and the search time
+    """
+    start_time = time.perf_counter()
+    with open(quest_file) as mazefile:
+        quest = Problem(mazefile, options['compact'], options['macro'],
+                        options['prune'])
+    quest.measure_closed_set = measure_closed_set
+    parse_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    solution = solve(quest, search, heuristic, indexed=options['indexed'])
+    return quest, solution, parse_time, time.perf_counter() - start_time
+
+def add_search_options(parser):
+    """
+    Add the --compact, --macro, --prune and --indexed options shared by
+    the command lines solving quests to the given parser
+    :param parser: (argparse.ArgumentParser) the command line parser
+    :return: None
+    """
+    parser.add_argument('--compact',
+                        help='represent states as (cell, medal bitmask)',
+                        action='store_true')
+    parser.add_argument('--macro',
+                        help='cross corridors between junctions in a '
+                             'single expansion (not with bfs and pbfs, '
+                             'which count moves)',
+                        action='store_true')
+    parser.add_argument('--prune',
+                        help='fail fast if a medal is unreachable and skip '
+                             'dead ends without a medal',
+                        action='store_true')
+    parser.add_argument('--indexed',
+                        help='astar and ucs: keep each state in the fringe '
+                             'at most once',
+                        action='store_true')
+
+def search_options(arguments):
+    """
+    Collect the options added by add_search_options
+    :param arguments: (argparse.Namespace) the parsed arguments
+    :return: (dictionary) the compact, macro, prune and indexed options
+    """
+    return {'compact': arguments.compact, 'macro': arguments.macro,
+            'prune': arguments.prune, 'indexed': arguments.indexed}
+
+def positive_integer(text):
+    """
+    Convert a command line argument to an integer of at least 1
+    :param text: (string) the argument
+    :return: (int) the value of the argument
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'{text} is not a positive integer')
+    return value
+
+def non_negative_integer(text):
+    """
+    Convert a command line argument to an integer of at least 0
+    :param text: (string) the argument
+    :return: (int) the value of the argument
+    """
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f'{text} is a negative integer')
+    return value
+
 def get_arguments():
     '''
     Parse and validate the command line arguments
-    :return: (tuple containing a file object and a string)
-            the maze file specified  and the search algoeithm specified
+    :return: (argparse.Namespace) the parsed arguments: the maze file
+            opened, the search algorithm and heuristic specified and
+            the search options
     '''
     parser = argparse.ArgumentParser()
     parser.add_argument('maze_file',
                         help='name of the text file containing the maze info',
                         type=argparse.FileType('r')) # open the file
     parser.add_argument('search_algorithm',
-                        help='astar, dfs, bfs or ucs?',
-                        choices=['astar','dfs', 'bfs', 'ucs'])
+                        help='astar, dfs, bfs, ucs, bidir, idastar, '
+                             'arastar, portfolio or pbfs?',
+                        choices=['astar','dfs', 'bfs', 'ucs', 'bidir',
+                                 'idastar', 'arastar', 'portfolio', 'pbfs'])
     parser.add_argument('heuristic',
                         help='A* heuristic',
                         nargs='?',
                         default='null_heuristic')
+    parser.add_argument('--no-display',
+                        help='print the statistics only, do not '
+                             'visualize the solution',
+                        action='store_true')
+    parser.add_argument('--cache',
+                        help='load the quest from its binary cache file, '
+                             'built on first use (see quest_cache.py)',
+                        action='store_true')
+    add_search_options(parser)
+    parser.add_argument('--closed',
+                        help='dfs, bfs, ucs and astar: keep the explored '
+                             'states in a Python set or as integer keys in '
+                             'a compact hash table',
+                        choices=data_structures.ClosedSet.BACKINGS,
+                        default='set')
+    parser.add_argument('--closed-memory',
+                        help='dfs, bfs, ucs and astar: report the memory '
+                             'used by the explored states',
+                        action='store_true')
+    parser.add_argument('--heuristic-cache',
+                        help='astar: number of heuristic values to cache, '
+                             '0 disables the cache',
+                        type=int,
+                        default=informed_search.HEURISTIC_CACHE_SIZE)
+    parser.add_argument('--table-size',
+                        help='idastar: number of states in the '
+                             'transposition table, 0 disables the table',
+                        type=int,
+                        default=informed_search.TRANSPOSITION_TABLE_SIZE)
+    parser.add_argument('--weight',
+                        help='astar: heuristic weight for weighted A*, '
+                             'arastar: initial weight (at least 1)',
+                        type=float)
+    parser.add_argument('--time-budget',
+                        help='arastar: seconds allowed to improve the '
+                             'solution',
+                        type=float)
+    parser.add_argument('--accept-suboptimal',
+                        help='portfolio: keep the first solution found '
+                             'even if it may not be optimal',
+                        action='store_true')
+    parser.add_argument('--workers',
+                        help='portfolio and pbfs: number of worker '
+                             'processes',
+                        type=positive_integer)
     arguments = parser.parse_args()
+    if arguments.weight is not None and arguments.weight < 1:
+        parser.error(f'--weight must be at least 1, not {arguments.weight}')
+    if arguments.macro and arguments.search_algorithm in STEP_SEARCHES:
+        parser.error(f'--macro cannot be used with '
+                     f'{arguments.search_algorithm}: it finds the fewest '
+                     f'moves and a macro move crosses a whole corridor')
+    return arguments
+
+def report_solution(cost, bound):
+    """
+    Print the cost of an intermediate solution found by an anytime search
+    :param
+    cost (int) the number of carrots consumed by the solution
+    bound (number) upper bound on cost / optimal cost
+    :return: None
+    """
+    print(f'Solution found: {cost} carrots, at most {bound:.3f} times '
+          f'the optimal')
 
-    maze_file = arguments.maze_file
-    search = arguments.search_algorithm
-    heuristic = arguments.heuristic
-    return maze_file, search, heuristic
+def portfolio_options(arguments):
+    """
+    Collect the portfolio and pbfs options given on the command line
+    :param arguments: (argparse.Namespace) as returned by get_arguments
+    :return: (dictionary) keyword arguments for the portfolio or pbfs
+            function
+    """
+    if arguments.search_algorithm == 'pbfs':
+        return {'workers': arguments.workers}
+    if arguments.search_algorithm != 'portfolio':
+        return {}
+    return {'accept_suboptimal': arguments.accept_suboptimal,
+            'workers': arguments.workers}
 
 def main():
-    maze_file, search, heuristic = get_arguments()
-    quest = Problem(maze_file)  # Initialize our search problem for this quest
-    start_time = time.time()
-    if search == "astar":
-        heuristic_function = getattr(informed_search, heuristic)
-        search_function = getattr(informed_search, search)
-        solution = search_function(quest, heuristic_function)
+    arguments = get_arguments()
+    # Initialize our search problem for this quest
+    if arguments.cache:
+        import quest_cache
+        arguments.maze_file.close()
+        quest = quest_cache.load_quest(arguments.maze_file.name,
+                                       arguments.compact, arguments.macro,
+                                       arguments.prune)
     else:
-        search_function = getattr(uninformed_search, search)
-        solution = search_function(quest)  # Invoke the search algorithm
+        quest = Problem(arguments.maze_file, arguments.compact,
+                        arguments.macro, arguments.prune)
+    quest.measure_closed_set = arguments.closed_memory
+    start_time = time.time()
+    out_of_time = False
+    try:
+        solution = solve(quest, arguments.search_algorithm,
+                         arguments.heuristic,
+                         indexed=arguments.indexed,
+                         cache_size=arguments.heuristic_cache,
+                         table_size=arguments.table_size,
+                         weight=arguments.weight,
+                         time_budget=arguments.time_budget,
+                         report=report_solution,
+                         closed_backing=arguments.closed,
+                         **portfolio_options(arguments))
+    except TimeoutError:
+        solution = None
+        out_of_time = True
     elapsed_time = time.time() - start_time
 
     # Print some statistics
     if solution is not None:
         print('Path length: ', len(solution))
         print('Carrots consumed: ', quest.path_cost(solution))
+    elif out_of_time:
+        print('No solution found within the time budget')
     else:
         print('The quest failed!')
+    for medal in quest.unreachable_medals:
+        print(f'Medal at {medal} cannot be reached')
     print(f'Number of nodes expanded: {quest.nodes_expanded():,}')
+    for description, count in quest.statistics.items():
+        print(f'{description}: {count:,}')
     print(f'Processing time: {elapsed_time:.4f}(sec)')
 
-    graphics.Display(quest, solution)  # Visualize the solution
+    if not arguments.no_display:
+        import graphics  # tkinter is only loaded to visualize the solution
+        try:
+            graphics.Display(quest, solution)  # Visualize the solution
+        except graphics.tkinter.TclError as error:
+            print(f'Cannot display the solution: {error}\n'
+                  f'Use --no-display on a machine without a display.')
 
 
 if __name__ == '__main__':
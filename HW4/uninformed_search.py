@@ -12,49 +12,142 @@ dfs has been implemented for you.
 Your task for homework 3 is to implement bfs and ucs.
 """
 import data_structures
+import search_stream
 
-def dfs(problem):
+def dfs(problem, closed_backing='set'):
     """
     Depth first graph search algorithm - implemented for you
-    :param problem (a Problem object) representing the quest
+    :param
+    problem (a Problem object) representing the quest
             see Problem class definition in spartanquest.py)
+    closed_backing (string) 'set' or 'compact', see ClosedSet
+            - defaults to 'set'
     :return: list of actions representing the solution to the quest
                 or None if there is no solution
     """
-    closed = set()  # keep track of our explored states
     fringe = data_structures.Stack() # for dfs, the fringe is a stack
-    state = problem.start_state()
-    root = data_structures.Node(state, None, None)
-    fringe.push(root)
-    while not fringe.is_empty():
-        node = fringe.pop()
-        if problem.is_goal(node.state):
-            return node.solution()  # we found a solution
-        if node.state not in closed:  # we are implementing graph search
-            closed.add(node.state)
-            for child_state, action, action_cost in problem.expand(node.state):
-                child_node = data_structures.Node(child_state, node, action)
-                fringe.push(child_node)
-    return None  # Failure -  no solution was found
+    return search_stream.run(search_stream.graph_search(
+        problem, fringe, closed_backing=closed_backing))
 
-def bfs(problem):
+def bfs(problem, closed_backing='set'):
     """
     Breadth first graph search algorithm
-    :param problem (a Problem object) representing the quest
+    :param
+    problem (a Problem object) representing the quest
             see Problem class definition in spartanquest.py)
+    closed_backing (string) 'set' or 'compact', see ClosedSet
+            - defaults to 'set'
     :return: list of actions representing the solution to the quest
             or None if there is no solution
     """
-    # Enter your  code here and remove the pass statement below
-    pass
+    fringe = data_structures.Queue() # for bfs, the fringe is a queue
+    return search_stream.run(search_stream.graph_search(
+        problem, fringe, closed_backing=closed_backing))
 
-def ucs(problem):
+def ucs(problem, indexed=False, closed_backing='set'):
     """
     Uniform cost first graph search algorithm
     :param
+    problem (a Problem object) representing the quest
+            see Problem class definition in spartanquest.py)
+    indexed (Boolean) if True, the fringe is an indexed priority queue
+            holding each state at most once - defaults to False
+    closed_backing (string) 'set' or 'compact', see ClosedSet
+            - defaults to 'set'
+    :return: list of actions representing the solution to the quest
+    """
+    if indexed:
+        fringe = data_structures.IndexedPriorityQueue()
+    else:
+        fringe = data_structures.PriorityQueue()  # for ucs, the fringe is a priority queue
+    return search_stream.run(search_stream.graph_search(
+        problem, fringe, search_stream.cumulative_cost, closed_backing))
+
+def bidir(problem):
+    """
+    Bidirectional uniform cost search for quests with a single medal
+    The medal position is the only goal, so a forward search from
+    Sammy's position and a backward search from the medal over the
+    reversed moves (with the cost of the original move) meet in the
+    middle.  Quests with zero or several medals, or where Sammy starts
+    on the medal, are handed to ucs.
+    :param
     problem (a Problem object) representing the quest
             see Problem class definition in spartanquest.py)
     :return: list of actions representing the solution to the quest
+            or None if there is no solution
+    """
+    if len(problem.medals) != 1:
+        return ucs(problem)
+    maze = problem.maze
+    start = maze.cell(problem.mascot_position)
+    goal = maze.cell(next(iter(problem.medals)))
+    if start == goal:
+        return ucs(problem)
+    # index 0 is the forward search, index 1 the backward search
+    costs = ({start: 0}, {goal: 0})  # best known cost to/from each cell
+    parents = ({start: None}, {goal: None})  # (neighbor cell, action)
+    closed = (set(), set())
+    fringes = (data_structures.PriorityQueue(),
+               data_structures.PriorityQueue())
+    fringes[0].push(start, 0)
+    fringes[1].push(goal, 0)
+    radius = [0, 0]  # cost of the last cell taken from each fringe
+    best_cost = float('inf')
+    meeting = None
+    while True:
+        for direction in (0, 1):
+            if fringes[direction].is_empty():
+                radius[direction] = float('inf')  # nothing left to explore
+        # Stop once no path through unexplored cells can beat the best one
+        if radius[0] + radius[1] >= best_cost:
+            break
+        # grow the search with the smaller fringe
+        if fringes[1].is_empty() or (not fringes[0].is_empty() and
+                                     len(fringes[0]) <= len(fringes[1])):
+            direction = 0
+        else:
+            direction = 1
+        cell = fringes[direction].pop()
+        if cell in closed[direction]:
+            continue
+        closed[direction].add(cell)
+        cost = costs[direction][cell]
+        radius[direction] = cost
+        other_costs = costs[1 - direction]
+        for neighbor, action, action_cost in \
+                problem.expand_cell(cell, reverse=direction == 1):
+            new_cost = cost + action_cost
+            if new_cost < costs[direction].get(neighbor, float('inf')):
+                costs[direction][neighbor] = new_cost
+                parents[direction][neighbor] = (cell, action)
+                fringes[direction].push(neighbor, new_cost)
+                if neighbor in other_costs and \
+                        new_cost + other_costs[neighbor] < best_cost:
+                    best_cost = new_cost + other_costs[neighbor]
+                    meeting = neighbor
+    if meeting is None:
+        return None  # Failure -  no solution was found
+    return _bidir_solution(parents, meeting)
+
+def _bidir_solution(parents, meeting):
+    """
+    Join the two halves of a bidirectional search into a solution
+    This is a private function.
+    :param
+    parents (tuple of two dictionaries) the forward and backward
+            parent pointers of each reached cell
+    meeting (int) the cell where the two searches meet
+    :return: list of actions from Sammy's position to the medal
     """
-    # Enter your code here and remove the pass statement below
-    pass
+    actions = []
+    cell = meeting
+    while parents[0][cell] is not None:  # back to Sammy's position
+        cell, action = parents[0][cell]
+        actions.append(action)
+    actions.reverse()
+    cell = meeting
+    while parents[1][cell] is not None:  # forward to the medal
+        cell, action = parents[1][cell]
+        actions.append(action)
+    return actions
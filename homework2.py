@@ -16,11 +16,17 @@ The functions must work with any dictionary specifying the carrot
 consumption.
 """
 
+try:
+    import numpy  # optional, used to vectorize the cost over many medals
+except ImportError:
+    numpy = None
+
 # Constants
 NORTH = "N"
 SOUTH = "S"
 EAST = "E"
 WEST = "W"
+VECTORIZE_MEDAL_COUNT = 32  # fewest medals worth a numpy expression
 
 def carrots_to_medal(sammy, medal, carrot_cost):
     """
@@ -47,6 +53,26 @@ def carrots_to_medal(sammy, medal, carrot_cost):
             numCarrots = (carrot_cost[WEST] * width) + (carrot_cost[NORTH] * height)        # sammy is below and to the right of medal
     return numCarrots
 
+def carrots_to_medals(sammy, medals, carrot_cost):
+    """
+    Compute the number of carrots that Sammy consumes to reach each of
+    the given medals, in a single numpy expression when there are many.
+    :param sammy (tuple) representing the position of Sammy in the grid
+    :param medals (list of tuples) containing the positions of medals
+    :param carrot_cost (dictionary) representing the carrot consumption
+    per step for each direction
+    :return: (list of integers) the number of carrots for each medal,
+             in the order of the medals
+    """
+    if numpy is None or len(medals) < VECTORIZE_MEDAL_COUNT:
+        return [carrots_to_medal(sammy, medal, carrot_cost)
+                for medal in medals]
+    offset = numpy.asarray(medals) - sammy      # (dx, dy) from sammy to each medal
+    return (numpy.where(offset[:, 0] > 0, carrot_cost[EAST] * offset[:, 0],
+                        -carrot_cost[WEST] * offset[:, 0]) +
+            numpy.where(offset[:, 1] > 0, carrot_cost[SOUTH] * offset[:, 1],
+                        -carrot_cost[NORTH] * offset[:, 1])).tolist()
+
 def min_carrots(sammy, medals, carrot_cost):
     """
     Compute the minimum number of carrots that Sammy consumes to reach a
@@ -58,7 +84,7 @@ def min_carrots(sammy, medals, carrot_cost):
     :return: (integer) the number of carrots.
     """
     if medals:
-        minimum = min(carrots_to_medal(sammy, medal, carrot_cost) for medal in medals)      # if medals is non-empty, return min number_of_carrots
+        minimum = min(carrots_to_medals(sammy, list(medals), carrot_cost))                   # if medals is non-empty, return min number_of_carrots
     else:
         minimum = None                                                                      # if medals is empty, return None
     return minimum
@@ -74,7 +100,9 @@ def most_carrots_medal(sammy, medals, carrot_cost):
     """
     # Enter your code here and remove the pass statement below
     if medals:
-        maximum = max(medals, key=lambda m: carrots_to_medal(sammy, m, carrot_cost))
+        medals = list(medals)
+        carrots = carrots_to_medals(sammy, medals, carrot_cost)
+        maximum = medals[carrots.index(max(carrots))]
     else:
         maximum = None
     return maximum